@@ -5,8 +5,10 @@
 #
 #   A "geoTiffWarp_{date/timestamp}" folder is created at the user specified, upon running the script this is requested, parent folder.
 #   An iterative folder search is carried out for all files with a '.tif' ending. GeoTiffs are then saved via GDAL
-#   warp to the same projection but in the datestamp folder. This removes the skew. The python script and a log file
-#   is saved to the datestamp folder
+#   warp to the same projection, as Cloud Optimized GeoTiffs, in the datestamp folder. This removes the skew. The
+#   python script and a log file is saved to the datestamp folder
+#
+#   The tif files are warped in parallel, one worker process per CPU.
 #
 # This script does not work in PyCharm 2018 calling osgeo through Anaconda package. Instead, run the script in
 # Anaconda shell which includes the osgeo package.
@@ -25,27 +27,112 @@ import sys
 import datetime
 import time
 import shutil
+import re
+import json
+import uuid
+import errno
+import psutil
 import logging as log
+import multiprocessing
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from collections import Counter
+from pathlib import Path
 
+# TODO: User to set the number of worker processes used to warp the tif files, one per CPU by default
+maxWorkers = os.cpu_count()
 
-def rasterCharacteristics(raster):
+# Threads used by GDAL within each worker process (compression, warping and decoding). The CPUs are shared between the
+# maxWorkers processes so that the processes together run about one thread per CPU, rather than each process running
+# a thread per CPU.
+threadsPerWorker = max(1, os.cpu_count() // maxWorkers)
+
+# GDAL configuration options, set once within each worker process by initWorker
+gdalConfig = {
+    # Threads GDAL uses for multi-threaded operations (e.g. compression), see threadsPerWorker
+    'GDAL_NUM_THREADS': str(threadsPerWorker),
+    # Stop GDAL listing the whole containing folder on every open to find sidecar files. Sidecar files (e.g. .tfw world
+    # files that may hold the georeferencing) are still found by probing for them directly. 'EMPTY_DIR' is not used as
+    # it would skip the sidecar files altogether.
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'TRUE',
+    # Size the raster block cache (MB) of each worker process so that source blocks read more than once by the warp are
+    # not repeatedly decompressed. A quarter of the physical memory is shared between the maxWorkers processes, but
+    # each process is given at least the GDAL default of 5% of the physical memory. With more than 5 workers the
+    # combined cache can therefore exceed a quarter of the memory (maxWorkers x 5%), reduce maxWorkers where memory is
+    # short. The cache is a maximum that is only filled as blocks are read.
+    'GDAL_CACHEMAX': str(int(psutil.virtual_memory().total * max(0.25 / maxWorkers, 0.05)) // (1024*1024)),
+}
+
+# File name pattern for tif files, compiled once. Previous raster outputs (saved with a '_warp.tif' end) are excluded
+# by the same pattern so that only a single test is made per file.
+tifPattern = re.compile(r'.*(?<!_warp)\.tif$')
+
+# The warped output is written as a Cloud Optimized GeoTiff (COG) which is tiled and includes overviews, so the warped
+# raster displays and tiles quickly at reduced resolutions. Multi-threaded LZW compression, see threadsPerWorker.
+cogCreationOptions = ['COMPRESS=LZW', 'PREDICTOR=YES', f'NUM_THREADS={threadsPerWorker}', 'BLOCKSIZE=512',
+                      'OVERVIEWS=IGNORE_EXISTING', 'BIGTIFF=IF_SAFER']
+
+# TODO: User to set printing to verbose for more print statements to support debugging
+verbose = False
+
+# TODO: User to set incremental to True to skip tif files that have been warped by a previous run and not modified
+# since. Previous runs are recorded in a manifest file (see manifestName) within the top folder.
+incremental = False
+manifestName = 'geoTiffWarp_manifest.json'
+
+# TODO: User to set the largest raster (uncompressed size in MB) that is staged in memory before being copied to the
+# output folder. Larger rasters are written directly to the output folder. Each worker process stages one raster at a
+# time, so up to maxWorkers rasters are staged at once. By default a quarter of the available memory is shared between
+# the worker processes.
+maxStagedMB = int(psutil.virtual_memory().available * 0.25 / maxWorkers) // (1024*1024)
+
+# Working memory (bytes) of the warp within each worker process. Up to 512MB, reduced so that the maxWorkers processes
+# together use no more than a quarter of the physical memory for warping.
+warpMemoryLimit = min(512*1024*1024, int(psutil.virtual_memory().total * 0.25 / maxWorkers))
+
+
+@lru_cache(maxsize=64)
+def srsFromWkt(wkt):
     '''
-    Input is GDAL raster object
-    :param raster: GDAL raster object
-    :return: Raster characteristics defined in a dictionary: 'ulx': upper left x coordinatel, 'uly': upper left
-    coordinate, 'xres': x resolution, 'yres': y resolution, 'xskew': x skew, 'yskew': y skew, 'srs': well-known text
-    representation of the coordinate reference system, 'prj': projection.
+    Coordinate reference system object from well-known text. Tif files in the same collection commonly share the same
+    coordinate reference system so the object is cached against the well-known text to avoid parsing it for every file.
+    :param wkt: Well-known text representation of the coordinate reference system
+    :return: osr.SpatialReference object
+    '''
+    srs = osr.SpatialReference()
+    if wkt:
+        srs.ImportFromWkt(wkt)
+    return srs
+
+
+@lru_cache(maxsize=64)
+def projectionName(proj):
+    '''
+    Name of a coordinate reference system, cached against the well-known text.
+    :param proj: Well-known text representation of the coordinate reference system
+    :return: Name of the projected (or geographic) coordinate reference system, None where there is no coordinate
+             reference system
     '''
+    srs = srsFromWkt(proj)
+    if srs.IsProjected():
+        return srs.GetAttrValue('projcs')
+    return srs.GetAttrValue('geogcs')
 
+
+def rasterResolution(raster):
+    '''
+    Values of a raster required to warp it, without the reporting of rasterCharacteristics.
+    :param raster: GDAL raster object
+    :return: Tuple of the x resolution, the y resolution, the well-known text representation of the coordinate
+             reference system, the projection name and whether the raster has an x or y skew.
+    '''
     ulx, xscale, xskew, uly, yskew, yscale = raster.GetGeoTransform()
-    print(raster.GetGeoTransform())
-    print(f'\t\tband count: {raster.RasterCount}')
-    print(f'\t\tUpper left x: {ulx}')
-    print(f'\t\tUpper left y: {uly}')
-    print(f'\t\tX skew: {xskew}')
-    print(f'\t\tY skew: {yskew}')
-    # Square root of x resolution square plus y skew squared
-    # Source: https://gis.stackexchange.com/questions/281132/why-doesnt-gdalinfo-report-pixel-size
+    # Get the Coordinate Reference System (CRS) of the layer
+    proj = raster.GetProjection()
+    if xskew == 0 and yskew == 0:
+        # No skew (the common case), the resolution is the pixel size
+        return abs(xscale), abs(yscale), proj, projectionName(proj), False
     if xscale != 0:
         # Square root of x resolution squared plus y skew squared
         # Source: https://gis.stackexchange.com/questions/281132/why-doesnt-gdalinfo-report-pixel-size
@@ -58,116 +145,393 @@ def rasterCharacteristics(raster):
         yres = round((yscale**2 + xskew**2)**0.5, 8)
     else:
         yres = yscale
-    print(f'\t\tX resolution: {xres}')
-    print(f'\t\tY resolution: {yres}')
+    return xres, yres, proj, projectionName(proj), True
 
-    # md = raster.GetMetadata()
-    # print(f'\t\tMetadata: {md}')
 
-    # Get the Coordinate Reference System (CRS) of the layer
-    proj = raster.GetProjection()
-    srs = osr.SpatialReference(wkt=proj)
+def warpOptions(proj, xres, yres):
+    '''
+    GDAL warp options for a skewed tif file, warped to its own coordinate reference system and resolution.
+    :param proj: Well-known text representation of the coordinate reference system
+    :param xres: X resolution
+    :param yres: Y resolution
+    :return: GDAL warp options
+    '''
+    # The warp is written directly as a COG, see cogCreationOptions. GDAL warps once to a temporary GeoTiff next to the
+    # output and copies that into the COG, so the warp is not repeated when the COG driver reads its source a second
+    # time to build the overviews. Multi-threaded warping, see threadsPerWorker. Nearest neighbour resampling is set
+    # explicitly so that the pixel values are retained and the more expensive bilinear/cubic resampling kernels are
+    # not used.
+    return gdal.WarpOptions(format='COG', creationOptions=cogCreationOptions, dstSRS=proj, xRes=xres, yRes=yres,
+                            resampleAlg=gdal.GRA_NearestNeighbour, targetAlignedPixels=True,
+                            multithread=threadsPerWorker > 1, warpOptions=[f'NUM_THREADS={threadsPerWorker}'],
+                            warpMemoryLimit=warpMemoryLimit)  # 'EPSG:4326'
 
-    if srs.IsProjected:
-        prj = srs.GetAttrValue('projcs')
-    else:
-        prj = srs.GetAttrValue('geogcs')
+
+def rasterCharacteristics(raster):
+    '''
+    Input is GDAL raster object. Used for reporting only (verbose), see rasterResolution for the values required to warp
+    the raster.
+    :param raster: GDAL raster object
+    :return: Raster characteristics defined in a dictionary: 'ulx': upper left x coordinatel, 'uly': upper left
+    coordinate, 'xres': x resolution, 'yres': y resolution, 'xskew': x skew, 'yskew': y skew, 'srs': well-known text
+    representation of the coordinate reference system, 'prj': projection.
+    '''
+
+    ulx, xscale, xskew, uly, yskew, yscale = raster.GetGeoTransform()
+    print(raster.GetGeoTransform())
+    print(f'\t\tband count: {raster.RasterCount}')
+    print(f'\t\tUpper left x: {ulx}')
+    print(f'\t\tUpper left y: {uly}')
+    print(f'\t\tX skew: {xskew}')
+    print(f'\t\tY skew: {yskew}')
+    xres, yres, proj, prj, skewed = rasterResolution(raster)
+    print(f'\t\tX resolution: {xres}')
+    print(f'\t\tY resolution: {yres}')
+
+    srs = srsFromWkt(proj)
 
     vals = {'ulx': ulx, 'uly': uly, 'xres': xres, 'yres': yres, 'xskew': xskew, 'yskew': yskew, 'srs': srs, 'prj': prj}
     return vals
 
-# Set intial time
-t0 = time.time()
-
-# parentFolder from which all content within subfolders is searched for s57 data
-parentFolder = input("Enter the top folder to search within for GeoTiff (.tif) data: ")
-while not os.path.exists(f'{parentFolder}'):  # Test to make sure an input was provided
-    print('No existing top folder provided...')
-    parentFolder = input("\tEnter the top folder: ")
-
-# Create folder to store coastline extracts with a date time stamp
-folderDateTime = f"_{datetime.datetime.now().strftime('%d_%m_%Y_%Hh%Mm%Ss')}"
-outFolder = os.path.join(os.path.split(parentFolder)[0],
-                         f'geoTiffWarp_{folderDateTime}')
-
-outFolder = os.path.join(parentFolder, f'geoTiffWarp_{folderDateTime}')
-print(f'Results in {outFolder}')
-# sys.exit()
-os.mkdir(outFolder)
-# Save the script to the outFolder to store with the outputs
-shutil.copy2(sys.argv[0], outFolder)
-
-# Establish the log file
-logfile = os.path.join(outFolder, rf'geoTiffWarp_logfile_{folderDateTime}.log')
-print(f'Logfile in: {logfile}')
-
-# os.path.join(os.path.split(workspace)[0],r'logfile.log')
-log.basicConfig(filename=logfile,
-                level=log.DEBUG,
-                filemode='w',  # 'w' = overwrite log file, 'a' = append
-                format='%(asctime)s,   Line:%(lineno)d %(levelname)s: %(message)s',
-                datefmt='%a %d/%b/%Y %I:%M:%S %p')
-# Log the path and name of the script used to the logfile
-log.info('Script started: ' + sys.argv[0])
-# Log the parent folder to the logfile
-log.info('Parent folder to find s57 data within: ' + parentFolder)
-
-# Flag that sets to True once the memory layer is used. User not required to change this.
-memLayersUsed = False
-
-# Initiate empty lists to contain the path to geotiffs and for non-georeferenced tiff files
-geotifList = []
-
-# Identify and process GeoTiffs to remove X and Y skew through projecting to source projection
-# TODO: consider whether resampling would achieve the same result
-for root, folder, files in os.walk(parentFolder):
-    for f in files:
-        # s57 data files end with a '000' extension.
-        if f.endswith('tif'):
-            # Ignore previous raster outputs (they're saved with a '_warp.tip' end.
-            if '_warp.tif' in f:
-                continue
-            filePath = os.path.join(root, f)
-            print(f'Tiff: {filePath}')
-            ds = gdal.Open(filePath)
-            print(f'\tSource raster characteristics:')
-            sourceVals = rasterCharacteristics(ds)
-
-            log.info(f'Tiff: {f}: path: {filePath}')
-
-            # Get the Coordinate Reference System (CRS) of the layer
-            proj = ds.GetProjection()
-            srs = osr.SpatialReference(wkt=proj)
-            # print(f'Proj: {proj}')
-            # print(f'Proj type: {type(proj)}')
-
-            print(f'\t\tProjection: {sourceVals["prj"]}')
-            if sourceVals["prj"] is not None:
-                geotifList.append(filePath)
-                log.info('Geotiff found, projection: {prj}')
-                outputFile = os.path.join(outFolder, f'{os.path.split(filePath)[1].split(".")[0]}_warp.tif')
-                warp = gdal.Warp(outputFile, filePath, dstSRS=proj, xRes=sourceVals['xres'], yRes=sourceVals['yres'],# xRes=sourceVals['xres']*-1, yRes=sourceVals['yres']
-                               targetAlignedPixels=True)# 'EPSG:4326'
-                print(f'\tProjected to original CRS: {outputFile}')
-                log.info(f'Projected to original CRS: {outputFile}')
-                ds = gdal.Open(outputFile)
+
+def iterTifs(folder):
+    '''
+    Recursively search a folder for tif files using os.scandir. The file type of each directory entry is cached from
+    the directory listing so no additional stat calls are required.
+    :param folder: Folder to search within
+    :return: Generator of directory entries (os.DirEntry) of tif files, excluding previous raster outputs (saved with a
+             '_warp.tif' end and within 'geoTiffWarp_' folders)
+    '''
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                # Do not search the output folders of previous runs
+                if not entry.name.startswith('geoTiffWarp_'):
+                    yield from iterTifs(entry.path)
+            elif tifPattern.match(entry.name):
+                yield entry
+
+
+def previouslyWarped(filePath, mtime, manifest):
+    '''
+    Test whether a tif file has been warped by a previous run and not modified since.
+    :param filePath: Path to the tif file
+    :param mtime: Modification time of the tif file
+    :param manifest: Dictionary of previously warped tif files, key is the path to the tif file and the value is a
+                     dictionary of the modification time of the tif file ('mtime') and the path to the warped output
+                     ('output')
+    :return: True if the tif file is unchanged and its warped output exists and is newer than the tif file
+    '''
+    previous = manifest.get(filePath)
+    if previous is None or previous['mtime'] != mtime:
+        return False
+    try:
+        return os.stat(previous['output']).st_mtime >= mtime
+    except OSError:
+        # The warped output no longer exists
+        return False
+
+
+def initWorker(logQueue):
+    '''
+    Initialise a worker process, setting the GDAL configuration options once before any tif file is opened. GDAL errors
+    are raised as exceptions rather than only being printed to stderr. Log records are passed back to the main process
+    through a queue, which writes them to the log file, rather than each worker writing to the log file.
+    :param logQueue: multiprocessing queue read by the QueueListener of the main process
+    :return: None
+    '''
+    rootLogger = log.getLogger()
+    rootLogger.handlers = [QueueHandler(logQueue)]
+    rootLogger.setLevel(log.DEBUG)
+    for key, value in gdalConfig.items():
+        gdal.SetConfigOption(key, value)
+    gdal.UseExceptions()
+
+
+def copyFromMemory(vsimemPath, outputFile):
+    '''
+    Copy a file from GDAL's in memory file system (/vsimem/) to disk in a single sequential write.
+    :param vsimemPath: Path to the file in the in memory file system
+    :param outputFile: Path to save the file to
+    :return: None
+    '''
+    if hasattr(gdal, 'CopyFile'):  # GDAL 3.7 and later
+        if gdal.CopyFile(vsimemPath, outputFile) != 0:
+            raise OSError(f'Could not copy {vsimemPath} to {outputFile}')
+        return
+    vsiFile = gdal.VSIFOpenL(vsimemPath, 'rb')
+    try:
+        with open(outputFile, 'wb') as out:
+            while True:
+                chunk = gdal.VSIFReadL(1, 64*1024*1024, vsiFile)
+                if not chunk:
+                    break
+                out.write(chunk)
+    finally:
+        gdal.VSIFCloseL(vsiFile)
+
+
+def outputFileNames(tifPaths, topFolder, outFolder):
+    '''
+    Path to the warped output of each tif file. Outputs are named from the file name stem of the tif file, which retains
+    any other '.' in the file name, e.g. 'photo.2019.tif' -> 'photo.2019_warp.tif'. Where tif files in different
+    folders share the same stem (ignoring case) the folder of each tif file, relative to the top folder, is added to the
+    name, e.g. 'area1/photo.tif' -> 'area1_photo_warp.tif'. As such a name may itself be taken (e.g. by a top folder
+    'area1_photo.tif') a counter is added where needed, e.g. 'area1_photo_1_warp.tif', so that every name is unique.
+    :param tifPaths: Paths to the tif files
+    :param topFolder: Top folder the tif files were found within
+    :param outFolder: Folder the warped tif files are saved to
+    :return: Dictionary of the path to the warped output, key is the path to the tif file
+    '''
+    stemCounts = Counter(Path(filePath).stem.lower() for filePath in tifPaths)
+    outputFiles = {}
+    # Names taken so far (ignoring case). Tif files with a unique stem are named first so that they keep their stem.
+    usedNames = set()
+    for filePath in tifPaths:
+        stem = Path(filePath).stem
+        if stemCounts[stem.lower()] == 1:
+            usedNames.add(stem.lower())
+            outputFiles[filePath] = str(Path(outFolder, f'{stem}_warp.tif'))
+    # Sorted so that each tif file keeps the same output name from run to run
+    for filePath in sorted(tifPaths):
+        if filePath in outputFiles:
+            continue
+        baseName = '_'.join(Path(filePath).relative_to(topFolder).with_suffix('').parts)
+        name = baseName
+        counter = 0
+        while name.lower() in usedNames:
+            counter += 1
+            name = f'{baseName}_{counter}'
+        usedNames.add(name.lower())
+        outputFiles[filePath] = str(Path(outFolder, f'{name}_warp.tif'))
+    return outputFiles
+
+
+def placeOutput(tmpFile, outputFile):
+    '''
+    Move a completed output from its temporary name to its final name without overwriting an existing file. A hard link
+    fails if the final name exists, so the check and the move are a single step. Where the file system does not support
+    hard links the file is renamed instead.
+    :param tmpFile: Path to the completed output under its temporary name, left in place to be removed by the caller
+                    where hard linked
+    :param outputFile: Final path of the output
+    :return: None, FileExistsError is raised if outputFile already exists
+    '''
+    try:
+        os.link(tmpFile, outputFile)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Hard links are not supported (e.g. FAT formatted drives and some network shares)
+        if os.path.exists(outputFile):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), outputFile)
+        os.rename(tmpFile, outputFile)
+
+
+def warpOne(filePath, outputFile):
+    '''
+    Warp a single tif file to its own coordinate reference system to remove the X and Y skew. This is run within a
+    worker process, see initWorker for how its log records reach the log file.
+    :param filePath: Path to the tif file
+    :param outputFile: Path to save the warped tif file to, an existing file is not overwritten. The warped tif file is
+                       written under a temporary name and only given this name once complete, see placeOutput.
+    :return: Tuple of the path to the tif file and the path to the warped output (None if the tif file has no
+             coordinate reference system or failed to warp)
+    '''
+    if verbose:
+        print(f'Tiff: {filePath}')
+    # Open as a GeoTiff directly rather than probing each of the registered drivers
+    try:
+        ds = gdal.OpenEx(filePath, gdal.OF_RASTER | gdal.OF_READONLY, allowed_drivers=['GTiff'],
+                         open_options=[f'NUM_THREADS={threadsPerWorker}'])
+    except RuntimeError as e:
+        log.error(f'Could not open {filePath}: {e}')
+        return filePath, None
+    if verbose:
+        print(f'\tSource raster characteristics:')
+        rasterCharacteristics(ds)
+    xres, yres, proj, prj, skewed = rasterResolution(ds)
+
+    log.info(f'Tiff: {os.path.split(filePath)[1]}: path: {filePath}')
+
+    if verbose:
+        print(f'\t\tProjection: {prj}')
+    if prj is not None:
+        log.info(f'Geotiff found, projection: {prj}')
+        # The output is written to a temporary name, unique to this worker, in the output folder so that a partial
+        # output never takes the final name and only files this worker created are removed on failure
+        token = uuid.uuid4().hex
+        stagedFile = f'/vsimem/{token}.tif'
+        tmpFile = f'{outputFile}.{token}.tmp'
+        try:
+            # The COG is staged in memory (along with the temporary files the COG driver creates) and then copied to
+            # the output folder in one sequential write, unless the raster is larger than maxStagedMB in which case it
+            # is written directly to the output folder to limit the memory used. The size of the source raster is used
+            # as an estimate of the size of the warped raster.
+            band = ds.GetRasterBand(1)
+            rasterMB = (ds.RasterXSize * ds.RasterYSize * ds.RasterCount * gdal.GetDataTypeSize(band.DataType)
+                        / 8 / (1024*1024))
+            band = None
+            staged = rasterMB <= maxStagedMB
+            if skewed:
+                # The already open dataset is warped so the tif file is not opened again
+                warp = gdal.Warp(stagedFile if staged else tmpFile, ds, options=warpOptions(proj, xres, yres))
+                message = f'Projected to original CRS: {outputFile}'
+            else:
+                # There is no skew to remove so the tif file is not warped, it is written straight to a COG like the
+                # warped tif files. The georeferencing, including any held in sidecar files (e.g. .tfw world files),
+                # is written into the COG.
+                warp = gdal.Translate(stagedFile if staged else tmpFile, ds, format='COG',
+                                      creationOptions=cogCreationOptions)
+                message = f'No skew, written without warping: {outputFile}'
+            if verbose:
+                print(f'\t{message}')
+            log.info(message)
+            if verbose:
+                # The dataset returned by gdal.Warp/gdal.Translate is already open, no need to reopen the output file
                 print(f'\tOutput raster characteristics:')
-                outputVals = rasterCharacteristics(ds)
+                outputVals = rasterCharacteristics(warp)
                 print(f'\t\tProjection: {outputVals["prj"]}')
                 print()
+            # Close the warped dataset, copy it to the output folder and give it its final name
+            warp = None
+            if staged:
+                copyFromMemory(stagedFile, tmpFile)
+            placeOutput(tmpFile, outputFile)
+        except (RuntimeError, OSError) as e:
+            # GDAL errors, disk errors (e.g. a full disk) and an existing output (FileExistsError) fail this tif file
+            # only, not the whole run
+            log.error(f'Failed to warp {filePath}: {e}')
+            warp = None
+            return filePath, None
+        finally:
+            # Free the memory and remove the temporary output, which is this worker's own file
+            if gdal.VSIStatL(stagedFile) is not None:
+                gdal.Unlink(stagedFile)
+            try:
+                if os.path.exists(tmpFile):
+                    os.remove(tmpFile)
+            except OSError as removeError:
+                log.error(f'Could not remove temporary output {tmpFile}: {removeError}')
+        return filePath, outputFile
 
-            else:
-                log.info('No projection, this file no longer considered')
-                print('No projection, this file no longer considered\n')
+    log.info('No projection, this file no longer considered')
+    if verbose:
+        print('No projection, this file no longer considered\n')
+    return filePath, None
+
+
+# The main process is guarded so that worker processes, which import this script, do not re-run it
+if __name__ == '__main__':
+    # Set intial time
+    t0 = time.time()
+
+    # parentFolder from which all content within subfolders is searched for s57 data
+    parentFolder = input("Enter the top folder to search within for GeoTiff (.tif) data: ")
+    while not os.path.exists(f'{parentFolder}'):  # Test to make sure an input was provided
+        print('No existing top folder provided...')
+        parentFolder = input("\tEnter the top folder: ")
+
+    # Create folder to store coastline extracts with a date time stamp
+    folderDateTime = f"_{datetime.datetime.now().strftime('%d_%m_%Y_%Hh%Mm%Ss')}"
+    outFolder = os.path.join(os.path.split(parentFolder)[0],
+                             f'geoTiffWarp_{folderDateTime}')
+
+    outFolder = os.path.join(parentFolder, f'geoTiffWarp_{folderDateTime}')
+    print(f'Results in {outFolder}')
+    # sys.exit()
+    os.mkdir(outFolder)
+    # Save the script to the outFolder to store with the outputs
+    shutil.copy2(sys.argv[0], outFolder)
+
+    # Establish the log file
+    logfile = os.path.join(outFolder, rf'geoTiffWarp_logfile_{folderDateTime}.log')
+    print(f'Logfile in: {logfile}')
+
+    # os.path.join(os.path.split(workspace)[0],r'logfile.log')
+    logFileHandler = log.FileHandler(logfile, mode='w')  # 'w' = overwrite log file, 'a' = append
+    logFileHandler.setFormatter(log.Formatter(fmt='%(asctime)s,   Line:%(lineno)d %(levelname)s: %(message)s',
+                                              datefmt='%a %d/%b/%Y %I:%M:%S %p'))
+    # Log records are buffered in memory and written to the log file in batches of 1000 (or on an error, or when the
+    # script completes) rather than one write per record.
+    log.basicConfig(level=log.DEBUG,
+                    handlers=[MemoryHandler(1000, flushLevel=log.ERROR, target=logFileHandler)])
+    # Log the path and name of the script used to the logfile
+    log.info('Script started: ' + sys.argv[0])
+    # Log the parent folder to the logfile
+    log.info('Parent folder to find s57 data within: ' + parentFolder)
+
+    # Collect the tif files, and their file stats (modification time and size), prior to processing so the warps can be
+    # distributed across worker processes. The file stats are taken from the directory entry found in the folder search.
+    tifStats = {entry.path: entry.stat() for entry in iterTifs(parentFolder)}
+    # The output file of every tif file found is named up front so that tif files sharing a file name stem are
+    # detected and given distinct outputs, and each tif file keeps the same output name from run to run
+    outputFiles = outputFileNames(list(tifStats), parentFolder, outFolder)
+
+    # Read the manifest of tif files warped by previous runs, only used by incremental runs. A manifest that cannot be
+    # read (e.g. truncated by an earlier run that was killed) is replaced, so every tif file is warped again.
+    manifestFile = os.path.join(parentFolder, manifestName)
+    manifest = {}
+    if incremental and os.path.exists(manifestFile):
+        try:
+            with open(manifestFile) as mf:
+                manifest = json.load(mf)
+        except (OSError, ValueError) as e:
+            log.warning(f'Could not read the manifest {manifestFile}, starting with an empty manifest: {e}')
+            print(f'Could not read the manifest {manifestFile}, starting with an empty manifest')
+
+    # Initiate empty lists to contain the path to the tif files to warp, those skipped as they have been warped by a
+    # previous run and the geotiffs (tif files with a CRS)
+    tifList = []
+    skippedList = []
+    geotifList = []
+    for filePath, stat in tifStats.items():
+        if incremental and previouslyWarped(filePath, stat.st_mtime, manifest):
+            skippedList.append(filePath)
+            log.info(f'Previously warped and unchanged, skipped: {filePath}')
+        else:
+            tifList.append(filePath)
+    # Largest files first so the worker processes are not left waiting on a single large file at the end of the run
+    tifList.sort(key=lambda path: tifStats[path].st_size, reverse=True)
+
+    # Identify and process GeoTiffs to remove X and Y skew through projecting to source projection. Each tif file is
+    # independent so they're warped in parallel, one process per CPU. Processes are used rather than threads as GDAL
+    # raster datasets are not thread safe.
+    # TODO: consider whether resampling would achieve the same result
+    # Log records of the worker processes are written to the log file by a listener thread of the main process. The
+    # worker processes are spawned rather than forked, as forking a process that is running threads (the listener) is
+    # not safe.
+    mpContext = multiprocessing.get_context('spawn')
+    logQueue = mpContext.Queue()
+    logListener = QueueListener(logQueue, *log.getLogger().handlers)
+    logListener.start()
+    try:
+        with ProcessPoolExecutor(max_workers=maxWorkers, mp_context=mpContext, initializer=initWorker,
+                                 initargs=(logQueue,)) as executor:
+            for filePath, outputFile in executor.map(warpOne, tifList, [outputFiles[p] for p in tifList]):
+                if outputFile is not None:
+                    geotifList.append(filePath)
+                    manifest[filePath] = {'mtime': tifStats[filePath].st_mtime, 'output': outputFile}
+    finally:
+        logListener.stop()
+        # Save the manifest so later incremental runs are able to skip the tif files warped by this run, including when
+        # the run stops part way through
+        if incremental:
+            with open(manifestFile, 'w') as mf:
+                json.dump(manifest, mf, indent=2)
+
+    print(f'\n{len(geotifList)} GeoTiffs found:')
+    for geotiff in geotifList:
+        print(f'\t{geotiff}')
 
-print(f'\n{len(geotifList)} GeoTiffs found:')
-for geotiff in geotifList:
-    print(f'\t{geotiff}')
+    if incremental:
+        print(f'\n{len(skippedList)} tif files previously warped and unchanged, skipped')
+        log.info(f'{len(skippedList)} tif files previously warped and unchanged, skipped')
 
-print(f'\nScript completed in {round((time.time() - t0)/60, 2)} minutes')
+    print(f'\nScript completed in {round((time.time() - t0)/60, 2)} minutes')
 
-log.info(f'{len(geotifList)} GeoTiff files found')
-log.info(f'Script completed in {round((time.time() - t0)/60, 2)} minutes')
+    log.info(f'{len(geotifList)} GeoTiff files found')
+    log.info(f'Script completed in {round((time.time() - t0)/60, 2)} minutes')
 
-print('Script complete.')
+    print('Script complete.')
 
@@ -4,13 +4,14 @@
 #      schema and add metadata from the S57 dataset including ENC name, ENC issue date, ENC comment and ENC scale.
 #
 #
-# Each input ENC file containing a feature/geometry type of interest results in a shapefile named per the source
-# S57 ENC file. The shapefiles are then combined into a composite shapefile which is labelled
-# 'global'_FEATURETYPE_GEOMETRYTYPE.shp, e.g. 'global_ACHARE_POINT.shp', 'global_CBLSUB_LINESTRING.shp'.
+# Each input ENC file containing a feature/geometry type of interest results in a GeoPackage (or shapefile, see
+# outputFormat) named per the source S57 ENC file. These are then combined into a composite which is labelled
+# 'global'_FEATURETYPE_GEOMETRYTYPE, e.g. 'global_ACHARE_POINT.gpkg', 'global_CBLSUB_LINESTRING.gpkg', and exported
+# to a composite shapefile, e.g. 'global_ACHARE_POINT.shp', 'global_CBLSUB_LINESTRING.shp'.
 #
 # A folder is created at the same level as the input parent folder from which the script starts searching for .000 files.
-# The folder contains the global shapefile, the Python script, a log file and a subfolder of the individual
-# shapefiles, one for each input .000 file that contains the feature of interest.
+# The folder contains the global extract and shapefile, the Python script, a log file and a subfolder of the individual
+# chart extracts, one for each input .000 file that contains the feature of interest.
 # Useful open source Python reference https://livebook.manning.com/book/geoprocessing-with-python/chapter-3/126
 #
 # For S57 feature types see:
@@ -20,15 +21,16 @@
 #  Along with the feature/geometry type extractions the two pdf files above will be copied to the output folder, along
 #  with this Python script and a log file detailing the processing.
 #
-#  An in memory layer is used between the source s57 data and the shapefile to enable transforming fields in the
-#  s57 data that are not supported in shapefiles (integer list and string list field types). These fields
-#  are converted to string field types and the content of the field is converted to a comma separated string.
+#  Fields in the s57 data that are not supported in shapefiles (integer list and string list field types) are created as
+#  string field types in the shapefile and the content of the field is converted to a comma separated string as the
+#  features are written.
 #
 # Duncan Moore (Duncan.Moore@ga.gov.au, Geoscience Australia), 2 February 2023
 
 ###############################################################################
 
 # Import required libraries
+from osgeo import gdal
 from osgeo import ogr
 from osgeo import osr
 import os
@@ -38,14 +40,20 @@ import time
 import shutil
 import logging as log
 import urllib.request
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from collections import Counter
+from pathlib import Path
 
 
 def getENCMetadata(data):
     '''
     Parameters
     ----------
-    data : TYPE osgeo.ogr.DataSource
-        S57 ogr datasource
+    data : TYPE osgeo.gdal.Dataset
+        S57 gdal vector dataset
 
     Returns
     -------
@@ -67,23 +75,32 @@ def getENCMetadata(data):
     # Issue date of the ENC
     issueDate = ''
     
-    for feature in layer:
-        layerDefinition = layer.GetLayerDefn()
-        for i in range(feature.GetFieldCount()):
-            # print(layerDefinition.GetFieldDefn(i).GetName())
-            # print(feature.GetField(i))
-            if layerDefinition.GetFieldDefn(i).GetName() == 'DSPM_CSCL':
-                scale = feature.GetField(i)
-            elif layerDefinition.GetFieldDefn(i).GetName() == 'DSID_DSNM':
-                dsnm = feature.GetField(i)
-            elif layerDefinition.GetFieldDefn(i).GetName() == 'DSID_COMT':
-                comment = feature.GetField(i)
-            elif layerDefinition.GetFieldDefn(i).GetName() == 'DSID_ISDT':
-                issueDate = feature.GetField(i)
-            # print()
+    # Look up the index of each field of interest once rather than comparing every field name of every feature.
+    # An index of -1 means the field does not exist in the DSID layer.
+    layerDefinition = layer.GetLayerDefn()
+    scaleIndex = layerDefinition.GetFieldIndex('DSPM_CSCL')
+    dsnmIndex = layerDefinition.GetFieldIndex('DSID_DSNM')
+    commentIndex = layerDefinition.GetFieldIndex('DSID_COMT')
+    issueDateIndex = layerDefinition.GetFieldIndex('DSID_ISDT')
+
+    # A chart has a single data set identification record so only the first feature of the DSID layer is read. The
+    # layer is reset again afterwards so the chart is read from the start for the feature layers.
+    layer.ResetReading()
+    feature = layer.GetNextFeature()
+    layer.ResetReading()
+    if feature is not None:
+        if scaleIndex != -1:
+            scale = feature.GetField(scaleIndex)
+        if dsnmIndex != -1:
+            dsnm = feature.GetField(dsnmIndex)
+        if commentIndex != -1:
+            comment = feature.GetField(commentIndex)
+        if issueDateIndex != -1:
+            issueDate = feature.GetField(issueDateIndex)
+        feature = None
     if verbose:
-        print(f'\nENC: {dsnm}, Issue date: {issueDate.encode("utf-8", "replace").decode()}, '
-              f'Scale: 1:{scale}, comment: {comment.encode("utf-8", "replace").decode()}')
+        print(f'\nENC: {dsnm}, Issue date: {str(issueDate).encode("utf-8", "replace").decode()}, '
+              f'Scale: 1:{scale}, comment: {str(comment).encode("utf-8", "replace").decode()}')
     return({'name':dsnm,'issueDate':issueDate,'scale':scale,'comment':comment})
 
 def featureTypeGetter(encList):
@@ -94,660 +111,798 @@ def featureTypeGetter(encList):
     :return: Unique list of feature type and geometry type (line, polygon, point) combinations that exist in the ENC
              sources
     '''
-    s57Driver = ogr.GetDriverByName("S57")
-
-    featureTypeDict = {}  # A dictionary is used for speed of use due to indexing.
+    featureTypeSet = set()  # A set is used as only the unique feature types are needed.
     for e in encList:
-        data = s57Driver.Open(e)
-        for layer in data:
-            if layer.GetName() not in featureTypeDict.keys():
-                featureTypeDict[layer.GetName()] = 1  # the dictionary value here is inconsequential
+        # Only the layer names are needed so the chart is opened without the LNAM_REFS feature references
+        data = gdal.OpenEx(e, gdal.OF_VECTOR | gdal.OF_READONLY, allowed_drivers=['S57'],
+                           open_options=s57OpenOptions + ['LNAM_REFS=OFF'])
+        for i in range(data.GetLayerCount()):
+            featureTypeSet.add(data.GetLayer(i).GetName())
+        # Release the chart datasource before opening the next chart
+        data = None
 
-    return list(featureTypeDict.keys())
+    return list(featureTypeSet)
 
 def chartGetter(topFolder):
     '''
-
-    :param topFolder:
-    :return:
+    Recursively search a folder for s57 ENC files. os.scandir is used rather than os.walk as the directory entries it
+    returns already know whether they are a folder or a file, which avoids a stat call for every file.
+    :param topFolder: Folder to search for s57 ENC files, including all subfolders
+    :return: Generator of paths to s57 ENC (.000) files
     '''
-    chartList = []
-    for root, folder, files in os.walk(topFolder):
-        for f in files:
+    with os.scandir(topFolder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from chartGetter(entry.path)
             # s57 data files end with a '000' extension.
-            if f.endswith('000'):
-                chartList.append(os.path.join(root, f))
-
-    return chartList
-
-# Set intial time
-t0 = time.time()
-# TODO: User to set printing to verbose for more print statements to support debugging
-verbose = False
-
-# The default is for s57 update files (e.g. .001, .002, .003, ..., .00N) to be applied to the .000 file that this script
-# finds and reads. Applying updates is set to ensure updates are applied.
-# https://gdal.org/drivers/vector/s57.html
-os.environ["OGR_S57_OPTIONS"] = "UPDATES=ON"
-
-# parentFolder from which all content within subfolders is searched for s57 data
-parentFolder = input("Enter the top folder to search within for s57 (.000) data: ")
-while not os.path.exists(f'{parentFolder}'):# Test to make sure an input was provided
-    print('No existing top folder provided...')
-    parentFolder = input("\tEnter the top folder: ")
-
-# TODO: The user is required to identify the feature type to extract and the geometry type of that feature
-# S57 feature type to extract: Consider Group 1 (higher priority) amongst Group 2 features
-# 'CBLSUB': Submarine cables,
-# 'CBLARE': Cable area
-# 'PIPSOL': Pipelines - Submarine or on land
-# 'PIPARE': Pipeline area
-# 'COALNE': coastline (broken by shoreline construction ('SLCONS'), This is not the charted low water line, see DEPCNT
-#           also see LNDARE
-# 'RESARE': Restricted area (other objects have an attribute RESTRN, e.g. 'CBLARE'
-# 'DEPCNT' # depth contour features, VALDCO = 0 = charted low water line, VALDCO < 0 = drying land
-# 'SBDARE' # Seabed area features (includes reefs, coral reefs = 'NATSUR' = 14)
-# 'SOUNDG' # Sounding, negative values are drying heights, this is a multipoint feature
-# 'DEPARE' # Depth Area, Group 1, DRVAL1 = drying height value for a range of drying values the shoalest is used
-# 'UWTROC' # Underwater rock
-# 'LNDARE' # Land area: Group 1 (Point, Line and Polygon geometry)
-# 'LNDELV' # Land elevation, spot heights and also represented in line geometry
-# 'UNSARE' # Unsurveyed Area: Group 1
-# 'BUISGL' # Building Single: light houses and other buildings.
-# 'BCNISD', 'BCNLAT', 'BCNSAW', 'BCNSPP'  # Beacon features
-
-# If True then all the available feature types are extracted as identified from the ENC source data
-# If False then a manually adjusted list is used.
-# TODO: User to set this to true if you would like to extract all the features that are present in the collection of
-# TODO: s57 files that are being processed. If false then the featureToExtractList is used instead. The latter has been
-# TODO: tested and is more likely to work.
-extractAlls57FeaturesInData = True
-
-encList = chartGetter(parentFolder)
-
-if extractAlls57FeaturesInData:
-    featureToExtractList = featureTypeGetter(encList)
-else:
-    # Manual setting of features to extract
-    # Priority 'Skin of the Earth' features for charting (Group 1) are:
-    # 'DEPARE', 'DRGARE', 'FLODOC', 'HULKES', 'LNDARE', 'PONTON', 'UNSARE'
-    # featureToExtractList = ['CBLSUB', 'COALNE', 'RESARE', 'DEPCNT', 'SBDARE', 'SOUNDG', 'DEPARE', 'LNDARE', 'LNDELV',
-    #                         'UNSARE', "BUISGL", 'UWTROC', 'BCNCAR', 'BCNISD', 'BCNLAT', 'BCNSAW', 'BCNSPP', 'CBLARE',
-    #                         'PIPSOL', 'PIPARE']
-    featureToExtractList = ['SOUNDG', 'LNDARE', 'LNDELV']
-
-print('Feature type list:')
-for f in featureToExtractList:
-    print(f'\t{f}')
-
-
-# List of geometry type to consider for each feature type as some features, e.g. LNDARE, which would be assumed to
-# be polygons have alternative representations, i.e. points, due to generalisation at small scale representation.
-featureTypeList = ['MULTIPOINT', 'POLYGON', 'POINT', 'LINESTRING']
+            elif entry.name.endswith('000'):
+                yield entry.path
 
+def extractFileNames(chartPaths, topFolder):
+    '''
+    Name of the extracts (and their layers) of each chart. Extracts are named after the chart file name. Where charts in
+    different folders share the same file name (ignoring case) the folder of each chart, relative to the top folder, is
+    added to the name so that no extract overwrites another, e.g. 'ENC/AU1/AU123456.000' -> 'ENC_AU1_AU123456.000'. As
+    such a name may itself be taken a counter is added where needed, so that every name is unique.
+    :param chartPaths: Paths to the s57 ENC (.000) files
+    :param topFolder: Top folder the charts were found within
+    :return: Dictionary of the extract name, key is the path to the chart
+    '''
+    nameCounts = Counter(os.path.split(chartPath)[1].lower() for chartPath in chartPaths)
+    extractNames = {}
+    # Names taken so far (ignoring case). Charts with a unique file name are named first so that they keep it.
+    usedNames = set()
+    for chartPath in chartPaths:
+        f = os.path.split(chartPath)[1]
+        if nameCounts[f.lower()] == 1:
+            usedNames.add(f.lower())
+            extractNames[chartPath] = f
+    for chartPath in sorted(chartPaths):
+        if chartPath in extractNames:
+            continue
+        baseName = '_'.join(Path(chartPath).relative_to(topFolder).parts)
+        name = baseName
+        counter = 0
+        while name.lower() in usedNames:
+            counter += 1
+            name = f'{baseName}_{counter}'
+        usedNames.add(name.lower())
+        extractNames[chartPath] = name
+    return extractNames
+
+def combinedSchema(extractList):
+    '''
+    Get the schema for a dataset combining all of the chart extracts in a list. The fields of the first extract are
+    used, with the width of each field set to the largest width of the field across all of the extracts so that
+    values are not truncated when the extracts are combined, e.g. the ENC metadata fields that are sized to the
+    metadata of each chart.
+    :param extractList: List of paths to the chart extracts to be combined
+    :return: List of ogr field definitions
+    '''
+    ds = ogr.Open(extractList[0])
+    # New field definitions are created with a width and precision of 0, which are then increased to fit the fields
+    fieldList = [ogr.FieldDefn(field.name, field.GetType()) for field in ds.GetLayer().schema]
+    ds = None
+    fieldDict = {field.GetName(): field for field in fieldList}
+    for extractFile in extractList:
+        ds = ogr.Open(extractFile)
+        for field in ds.GetLayer().schema:
+            if field.name in fieldDict:
+                combinedField = fieldDict[field.name]
+                if field.GetWidth() > combinedField.GetWidth():
+                    combinedField.SetWidth(field.GetWidth())
+                if field.GetPrecision() > combinedField.GetPrecision():
+                    combinedField.SetPrecision(field.GetPrecision())
+        ds = None
+
+    return fieldList
+
+def appendWithArrow(srcLayer, dstLayer):
+    '''
+    Append all of the features of a layer to another layer in record batches with the GDAL Arrow interface (GDAL 3.8+)
+    rather than feature by feature. Fields are matched by name and the FIDs of the source features are not kept.
+    :param srcLayer: ogr layer to read the features from
+    :param dstLayer: ogr layer to append the features to
+    :return: True if all of the batches were written, otherwise False
+    '''
+    stream = srcLayer.GetArrowStream(['INCLUDE_FID=NO', 'MAX_FEATURES_IN_BATCH=65536'])
+    schema = stream.GetSchema()
+    # The geometry column of the stream is named after the geometry column of the layer, 'wkb_geometry' if it has none
+    geometryName = srcLayer.GetGeometryColumn() or 'wkb_geometry'
+    while True:
+        array = stream.GetNextRecordBatch()
+        if array is None:
+            break
+        # WriteArrowBatch returns an OGRErr code, which is 0 (OGRERR_NONE) on success
+        if dstLayer.WriteArrowBatch(schema, array, [f'GEOMETRY_NAME={geometryName}']) != ogr.OGRERR_NONE:
+            return False
+
+    return True
+
+# Record of whether each ogr driver supports transactions, keyed on the driver name, so support is only tested once
+transactionSupport = {}
+
+def startTransaction(layer, driverName):
+    '''
+    Start a transaction on an ogr layer so that the features created in it are committed together rather than one at a
+    time. Drivers that do not support transactions are recorded so the attempt is only made once for each driver.
+    :param layer: ogr layer that features are about to be created in
+    :param driverName: Name of the ogr driver of the layer's datasource
+    :return: True if a transaction was started and needs to be committed (or rolled back), otherwise False
+    '''
+    if transactionSupport.get(driverName, True):
+        result = layer.StartTransaction()
+        if result == ogr.OGRERR_UNSUPPORTED_OPERATION:
+            transactionSupport[driverName] = False
+        else:
+            transactionSupport[driverName] = True
+            return result == ogr.OGRERR_NONE
+    return False
 
-# SAFEMODE: used to only transfer the fields in the fieldsToRetain list and none of the other fields in the source data.
-# This is used when errors occur relating to the field types, e.g. string list or integer list field types
-#  that are not supported in shapefiles.
-safemode = False
-# Set the fields to retain
-fieldsToRetain = ['RCID', 'PRIM', 'GRUP', 'OBJL', 'RVER', 'AGEN', 'FIDN', 'FIDS', 'LNAM', 'WATLEV',
-                  'OBJNAM']  # 'NATSUR', # StringList type fields cause th memLayer to crash
 
-dateTimeNow = f"_{datetime.datetime.now().strftime('%d_%m_%Y_%Hh%Mm%Ss')}"
-
-# Create folder to store coastline extracts with a date time stamp
-folderDateTime = dateTimeNow
-extractRoot = os.path.join(os.path.split(parentFolder)[0],
-                         f'{os.path.split(parentFolder)[1]}_extracted_{folderDateTime}')
-
-# Make the root directory
-os.makedirs(extractRoot)
-
-# Establish the log file
-logfile = os.path.join(extractRoot, rf'featureExtraction_logfile_{folderDateTime}.log')
-print(f'Logfile in: {logfile}')
-
-log.basicConfig(filename=logfile,
-                    level=log.DEBUG,
-                    filemode='w',# 'w' = overwrite log file, 'a' = append
-                    format='%(asctime)s,   Line:%(lineno)d %(levelname)s: %(message)s',
-                    datefmt='%a %d/%b/%Y %I:%M:%S %p')
-# Log the path and name of the script used to the logfile
-log.info('Script started: ' + sys.argv[0])
-# Log the parent folder to the logfile
-log.info('Parent folder to find s57 data within: ' + parentFolder)
-
-# Save the script to the outFolder to store with the outputs
-shutil.copy2(sys.argv[0], extractRoot)
-
-# Copy the example QGIS project which includes example S.57 data, ENC/chart webservices and the ESRI World Image
-# basemap to the output data folder. Users can then trace the source to feature/geometry type extractions including the
-# chart specific and global compilations.
-if os.path.exists(os.path.join(os.path.split(extractRoot)[0], 'qgis')):
-    print(f'Copying QGIS folder: {os.path.join(os.path.split(extractRoot)[0],"qgis")}')
-    print(f'To {os.path.join(extractRoot, "qgis")}')
-    shutil.copytree(os.path.join(os.path.split(extractRoot)[0], 'qgis'), os.path.join(extractRoot, 'qgis'))
-    log.info(f'Copied example QGIS project to: {extractRoot}\qgis')
-else:
-    log.info(f'Copy failed, QGIS project example does not exist')
-
-
-# Attempt to save the s57 reference docs to the outfolder
-refList = [r'https://iho.int/iho_pubs/standard/S-57Ed3.1/S-57%20Appendix%20B.1%20Annex%20A%20UOC%20Edition%204.1.0_Jan18_EN.pdf',
-           r'https://www.hydro.gov.au/prodserv/important-info/SPEC_05_55_AA34159_AUOC.pdf']
-for url in refList:
-    if not os.path.exists(os.path.join(extractRoot, os.path.split(url)[1])):
-        try:
-            print(f'Attempting to save to: {os.path.join(extractRoot, os.path.split(url)[1])}')
-            urllib.request.urlretrieve(url, os.path.join(extractRoot, os.path.split(url)[1]))
-        except:
-            print(f'\tCould not download/save: {url}')
-    else:
-        print('\tFile exists, not overwritten')
+def initWorker(logQueue):
+    '''
+    Initialise a worker process so that its log records are passed back to the main process through a queue, which
+    writes them to the log file, rather than each worker writing to the log file.
+    :param logQueue: multiprocessing queue read by the QueueListener of the main process
+    :return: None
+    '''
+    rootLogger = log.getLogger()
+    rootLogger.handlers = [QueueHandler(logQueue)]
+    rootLogger.setLevel(logLevel)
 
-#os.path.join(os.path.split(workspace)[0],r'logfile.log')
 
-if extractAlls57FeaturesInData:
-    log.info('All available feature types being extracted from the s.57 source data')
-noneTypeGeometry = []
+def processChart(chartPath, extractName, featureToExtractList, extractFolders):
+    '''
+    Extract each feature/geometry type combination in an s57 chart to an extract for the chart. Charts are independent
+    of each other so this is run in a worker process for each chart.
+    :param chartPath: Path to the s57 ENC (.000) file
+    :param extractName: Name of the extracts of the chart, unique across all charts, see extractFileNames
+    :param featureToExtractList: List of s57 feature types to extract
+    :param extractFolders: Dictionary of the ogr geometry type and the folder to save the chart extract to, keyed on
+                           the (feature type, geometry type) combination
+    :return: Tuple of a dictionary of the lists used to report on each feature/geometry type combination for this
+             chart, keyed as per extractFolders, and a list of the feature types with a None type geometry
+    '''
+    extractions = {}
+    noneTypeGeometry = []
+    # Number of features extracted for each feature/geometry type combination found in the chart
+    extractCountList = []
 
-for featureToExtract in featureToExtractList:
-    print(f'\n**********************************************\nExtracting feature: {featureToExtract}'
+    f = os.path.split(chartPath)[1]
+    print(f'\n**********************************************\nExtracting features from chart: {f}'
           f'\n**********************************************\n')
-    for featureType in featureTypeList:
-        if featureType == 'LINESTRING':
-            geomType = ogr.wkbLineString
-        elif featureType == 'POLYGON':
-            geomType = ogr.wkbPolygon
-        elif featureType == 'POINT':
-            geomType = ogr.wkbPoint25D
-        elif featureType == 'MULTIPOINT':
-            geomType = ogr.wkbMultiPoint25D
-        else:
-            sys.exit(f'Feature type not handled: {featureType}')
-
-        outFolder = os.path.join(extractRoot, f'{featureToExtract}', f'{featureType}')
-        chartExtractFolder = os.path.join(outFolder, f'ENCsContaining{featureType}')
-        print(f'Extracting {featureToExtract} of geometry type {featureType} to {outFolder} with chart extracts in'
-                 f' {chartExtractFolder}')
-        log.info(f'Extracting {featureToExtract} of geometry type {featureType} to {outFolder} with chart extracts in'
-                 f' {chartExtractFolder}')
-
-        os.makedirs(outFolder)
-        os.makedirs(chartExtractFolder)
-
-        # Flag that sets to True once the memory layer is used. User not required to change this.
-        memLayersUsed = False
-
-        s57Driver = ogr.GetDriverByName("S57")
-
-        # AttributesOfListType = []
-        failS57SourceList = []
-
-        # Initiate empty lists to contain the path to s57 files that contain or
-        # don't contain coastline data. Only used to report on numbers of charts with
-        # coastline at the end of the script.
-        chartList = []
-        chartsNoFeatureList = []
-        chartsWithFeatureList = []
-        # Create a list to store the shapefiles created for each chart to combine later
-        # into a single composite
-        chartShapefileList = []
-
-        for enc in encList:
-            AttributesOfListType = []
-            chartPath = enc
-            f = os.path.split(enc)[1]
-            if verbose:
-                print(f'Chartpath: {chartPath}')
-            chartList.append(chartPath)
-            # Use the s57 driver to open the chart
-            data = s57Driver.Open(chartPath)
+    if verbose:
+        print(f'Chartpath: {chartPath}')
+    # Use the s57 driver to open the chart read only. The chart is only opened once for all of the feature/geometry
+    # type combinations as opening the chart and applying its updates is the expensive part of reading it.
+    data = gdal.OpenEx(chartPath, gdal.OF_VECTOR | gdal.OF_READONLY, allowed_drivers=['S57'],
+                       open_options=s57OpenOptions)
+
+    # Get the metadata relating to the ENC collection
+    ENCmetaDict = getENCMetadata(data)
+    # The ENC metadata is the same for every feature in the chart so the value of each metadata field is found once
+    metaDict = {"ENCSource":"name", "ENCissDate":"issueDate", "ENCComment":"comment", "ENCScale":"scale"}
+    metaValueDict = {k: str(ENCmetaDict.get(v, 'Transfer from s57 failed')) for k, v in metaDict.items()}
+
+    for featureToExtract in featureToExtractList:
+        # Get the S57 layer that corresponds to the "featureToExtract" value
+        layer = data.GetLayerByName(featureToExtract)
+        if layer:
+            # The layer definition and its field definitions are the same for each geometry type so they are fetched
+            # once for the layer rather than for each geometry type and each use of layer.schema
+            layerDefinition = layer.GetLayerDefn()
+            layerFieldList = [layerDefinition.GetFieldDefn(i) for i in range(layerDefinition.GetFieldCount())]
+            # Fields that are not transferred to the extract are not read from the chart at all. The feature style
+            # string is never used and in safemode neither are the fields that are not retained.
+            ignoredFields = ['OGR_STYLE']
+            if safemode:
+                ignoredFields += [field.name for field in layerFieldList if field.name not in fieldsToRetainSet]
+            layer.SetIgnoredFields(ignoredFields)
+            # The s57 driver knows the number of features in the layer without reading them (-1 if it does not).
+            # Layers with no features are not read and no extract is created for them.
+            layerFeatureCount = layer.GetFeatureCount(force=0)
+        for featureType in featureTypeList:
+            geomType, chartExtractFolder = extractFolders[(featureToExtract, featureType)]
+            extraction = {'failS57SourceList': [], 'chartList': [], 'chartsNoFeatureList': [],
+                          'chartsWithFeatureList': [], 'chartExtractList': []}
+            extractions[(featureToExtract, featureType)] = extraction
+            failS57SourceList = extraction['failS57SourceList']
+            chartList = extraction['chartList']
+            chartsNoFeatureList = extraction['chartsNoFeatureList']
+            chartsWithFeatureList = extraction['chartsWithFeatureList']
+            chartExtractList = extraction['chartExtractList']
 
-            # Get the S57 layer that corresponds to the "featureToExtract" value
-            layer = data.GetLayerByName(featureToExtract)
+            chartList.append(chartPath)
+            # Count of features in the layer of the matching geometry type, counted as the features are written to
+            # the extract so the layer is only read once
+            importFeatureCount = 0
+            outFile = None
             if layer:
                 chartsWithFeatureList.append(chartPath)
+            if layer and layerFeatureCount != 0:
                 if verbose:
                     print(f'layer: {layer}')
-                featureCount = layer.GetFeatureCount()
-                if verbose:
-                    print(f"Number of features {featureCount}")
+                    print(f"Number of features {layerFeatureCount}")
                     print(f'layer type: {type(layer)}')
-                importFeatureCount = 0
-                for feat in layer:
-                    geom = feat.GetGeometryRef()
-                    if verbose:
-                        print(f'\tGeometry (type: {type(geom)}): {geom}')
-                        print(f'\tFeatureType: {featureType}')
-                        print(f'Feature types match: {featureType==layer.GetGeomType}')
-                    try:
-                        if feat.geometry().GetGeometryName() != featureType:
-                            if verbose:
-                                print(f'Layer of same feature name but not matching geometry type: '
-                                      f'{featureType} != {feat.geometry().GetGeometryName()}')
-                            continue
-
-                    except:
-                        log.info(f'{featureToExtract} has a None type geometry')
-                        if verbose:
-                            print(f'{featureToExtract} has a None type geometry')
-                        noneTypeGeometry.append(featureToExtract)
-                        continue
-
-                    else:
-                        if verbose:
-                            print(f'Layer of same feature name and matching geometry type: '
-                                  f'{featureType} != '
-                                f'{feat.geometry().GetGeometryName()}')
-                        importFeatureCount += 1
-                        # sys.exit()
-
-
-            # If the featureToExtract layer does not exist...
-            if not layer or importFeatureCount == 0:
-                chartsNoFeatureList.append(chartPath)
-                print(f'\t\t{featureToExtract} layer in chart not found')
-                log.info(f'chart {f} does not contain {featureToExtract}')
-                # sys.exit('ERROR: can not find layer in chart')
-            # If the coastline layer does exist.
-            else:
-                print(f'\t\tFound {featureToExtract} layer in chart')
-                log.info(f'Chart {f} does contain {featureToExtract}')
-
-                # Get the metadata relating to the ENC collection
-                ENCmetaDict = getENCMetadata(data)
 
                 # Get the Coordinate Reference System (CRS) of the layer
                 proj = layer.GetSpatialRef()
                 if verbose:
                     print(f'\t\t\t\tGet projection: {proj}')
-                if verbose:
-                    print('\t\t\t\t\nCreate layer in memory')
-
-                # Create an output datasource in memory to initially store
-                # the data and convert the field definition to a field
-                # that can be exported to a shapefile.
-                memDriver = ogr.GetDriverByName("MEMORY")
 
-                # Create a layer in the memory datasource and define attribute
-                # table schema along with the CRS.
-                memDS = memDriver.CreateDataSource('memData')
-                memLayer = memDS.CreateLayer(f, proj, geom_type=geomType)
+                # Create the output extract
+                outFile = os.path.join(chartExtractFolder, f"{extractName}{outputExtensionDict[outputFormat]}")
+                if verbose:
+                    print(f'chartExtractFolder: {chartExtractFolder}')
+                    print(f'f: {f}')
+                    print(f'outFile: {outFile}')
+                outDS = outDriver.CreateDataSource(outFile)
+                if outDS is None:
+                    # e.g. the extract already exists, the chart is reported as failed rather than stopping the run
+                    failS57SourceList.append(f)
+                    log.error('Could not create the extract %s of chart %s', outFile, chartPath)
+                    continue
+                # Create layer to match the CRS of the source data
+                outLayer = outDS.CreateLayer(extractName, proj, geom_type=geomType)
 
                 # print the ENC layer attribute table schema
                 if verbose:
                     print('\n\tS57 ENC schema:')
-                if verbose:
-                    for field in layer.schema:
-                        print(f'\t\t{field.name} (type: {field.GetFieldTypeName(field.GetType())})')
-                # Create the attribute table (fields) according to the layer
-                # schema.
-                memLayer.CreateFields(layer.schema)
-                if verbose:
-                    print('\nMemLayer fields prior to alteration:')
-                    for field in memLayer.schema:
+                    for field in layerFieldList:
                         print(f'\t\t{field.name} (type: {field.GetFieldTypeName(field.GetType())})')
 
-                indexCounter = 0
-                fieldIndexList = []
-                if safemode:
-                    for field in memLayer.schema:
-                        if field.name not in fieldsToRetain:
-                            if verbose:
-                                print(f'Deleting field: {field.name} at index {indexCounter}')
-                            fieldIndexList.append(indexCounter)
-                            memLayer.DeleteField(indexCounter)
-                        else:
-                            indexCounter += 1
-
+                # Create the attribute table (fields) according to the layer schema. The features are written straight
+                # to the extract so the string list and integer list field types, which are not supported in
+                # shapefiles, are created as string fields and their content is converted to a comma separated
+                # string as each feature is written. The 'STATUS' field is also created as a string field as it
+                # appears to cause issues for some submarine cables feature layers. In safemode only the fields in the
+                # fieldsToRetain list are created.
                 if verbose:
-                    print('\nMemLayer fields post alteration due to safemode:')
-                for field in memLayer.schema:
-                    if verbose:
-                        print(f'\t\t{field.name} (type: {field.GetFieldTypeName(field.GetType())})')
-                    if field.GetFieldTypeName(field.GetType()) in ['StringList', 'IntegerList']:
-                        i = memLayer.GetLayerDefn().GetFieldIndex(field.name)
-                        fld_defn = ogr.FieldDefn(field.name, ogr.OFTString)
-                        memLayer.AlterFieldDefn(i, fld_defn, ogr.ALTER_TYPE_FLAG)
+                    print('\n\tCreating extract fields, string list and integer list field types as string field type:')
+                for field in layerFieldList:
+                    if safemode and field.name not in fieldsToRetainSet:
                         if verbose:
-                            print(f'\t\t\ttype changed to: {field.GetFieldTypeName(field.GetType())})')
-
-                # type to string within the in-memory layer
-                if verbose and not safemode:
-                    print('\n\tAltering "STATUS" field definition of string list and '
-                          'integer list field types to string field type:')
-
-                # Alter the status field type for the in memory layer prior to adding data
-                # The 'STATUS' field appears to cause issues if this field type alteration is completed
-                # following the addition of data for some submarine cables feature layers.
-                for attribute in ['STATUS']:
-                    if verbose:
-                        print(f'\t\t{attribute}')
-                    i = memLayer.GetLayerDefn().GetFieldIndex(attribute)
-                    # Alter the field definition only where the field exists in the schema, i.e. not = -1
-                    if i != -1:
-                        fld_defn = ogr.FieldDefn(attribute, ogr.OFTString)
-                        memLayer.AlterFieldDefn(i, fld_defn, ogr.ALTER_TYPE_FLAG)
-                    else:
+                            print(f'\t\tNot creating field: {field.name}')
+                        continue
+                    if field.GetType() in listFieldTypes or field.name == 'STATUS':
                         if verbose:
-                            print('\t\t\tSTATUS field not found')
+                            print(f'\t\t{field.name} (type changed from {field.GetFieldTypeName(field.GetType())} '
+                                  f'to String)')
+                        outLayer.CreateField(ogr.FieldDefn(field.name, ogr.OFTString))
+                    else:
+                        outLayer.CreateField(field)
 
-                # Add string type fields to contain the source chart file name
+                # Add string type fields to contain the source chart file name. The width of each field is set to the
+                # length of its value (in bytes, up to the 254 character limit of shapefiles) rather than the default
+                # width of 80 characters, as each feature of the shapefile is padded to the width of the field.
                 strFields = ["ENCSource", "ENCissDate", "ENCComment"]
                 if verbose:
                     print(f'\n\tAdding ENC metadata string type fields to layer: {strFields}')
 
                 for field in strFields:
                     idField = ogr.FieldDefn(field, ogr.OFTString)
-                    memLayer.CreateField(idField)
+                    idField.SetWidth(min(254, max(1, len(metaValueDict[field].encode('utf-8')))))
+                    outLayer.CreateField(idField)
 
-                # Add integer type fields to contain the source chart file name
+                # Add integer type fields to contain the source chart file name, with the width set to the number of
+                # digits of the value
                 intFields = ["ENCScale"]
                 if verbose:
                     print(f'\n\tAdding ENC metadata integer type fields to layer: {intFields}')
                 for field in intFields:
                     idField = ogr.FieldDefn(field, ogr.OFTInteger)
-                    memLayer.CreateField(idField)
+                    if metaValueDict[field].isdigit():
+                        idField.SetWidth(len(metaValueDict[field]))
+                    outLayer.CreateField(idField)
 
                 if verbose:
-                    print('\n\tS57 memLayer schema post safemode alterations and metadata field additions:')
-                count = 0
-                for field in memLayer.schema:
-                    if field in strFields or field in intFields:
-                        continue
-                    if verbose:
-                        # print(f'Field count: {count}')
+                    print('\n\tExtract schema post safemode alterations and metadata field additions:')
+                    for field in outLayer.schema:
                         print(f'\t\t{field.name} (type: {field.GetFieldTypeName(field.GetType())})')
 
-                    layerDefinition = layer.GetLayerDefn()
-                    # fieldType = memLayer.GetFieldDefn(count).GetFieldTypeName(fieldTypeCode)
-                    # print(f'\t\t\t\tField type code: {fieldType}')
-                    # if 'List' in str(fieldType):
-                    #     if verbose:
-                    #         print(f'\t\tString field type')
-                    #     i = memLayer.GetLayerDefn().GetFieldIndex(count)
-                    #     fld_defn = ogr.FieldDefn(field.name, ogr.OFTString)
-                    #     memLayer.AlterFieldDefn(i, fld_defn, ogr.ALTER_TYPE_FLAG)
-                    count += 1
-
-                # sys.exit()
-                # mem_defn = memLayer.GetLayerDefn()
-                # if verbose:
-                #     print('\t\t\t\tmem_defn complete')
-                # sys.exit()
-
-                if f not in [r'test']:
+                outLayerDefn = outLayer.GetLayerDefn()
+                outFeat = ogr.Feature(outLayerDefn)
 
+                if verbose:
+                    print('\t\t\t\tWriting from S57 to extract')
+                # Map each field of the s57 layer to the index of the field of the same name in the extract once per
+                # chart rather than looking up the field definitions for every field of every feature. If the schema
+                # does not match then assuming they are in the same order and have the same fields is inaccurate. An
+                # index of -1 means the field is not transferred, e.g. it was not created in safemode or it is one of
+                # the ENC metadata fields.
+                metaFieldSet = frozenset(strFields + intFields)
+                outFieldIndexList = []
+                fieldNameList = []
+                # The map of s57 field index to extract field index used to copy each feature with SetFromWithMap.
+                # The list fields are not copied by the map as they are converted to comma separated strings, they are
+                # set from the s57 field index, extract field index and is string list entries in listFieldIndexList
+                # instead. The field types are checked here once per chart rather than for every field of every feature.
+                outFieldMap = []
+                listFieldIndexList = []
+                for i, fieldDefn in enumerate(layerFieldList):
+                    fieldName = fieldDefn.GetName()
+                    fieldType = fieldDefn.GetFieldTypeName(fieldDefn.GetType())
+                    if fieldName in metaFieldSet:
+                        outIndex = -1
+                    else:
+                        outIndex = outLayerDefn.GetFieldIndex(fieldName)
                     if verbose:
-                        print('\nGet memory layer definition...')
-                    mem_feat = ogr.Feature(memLayer.GetLayerDefn())
+                        print(f"\t\t\t\tField: {fieldName}, type: {fieldType}, width: {fieldDefn.GetWidth()}, "
+                              f"precision: {fieldDefn.GetPrecision()}, index in extract: {outIndex}")
+                    outFieldIndexList.append(outIndex)
+                    fieldNameList.append(fieldName)
+                    if fieldDefn.GetType() in listFieldTypes:
+                        outFieldMap.append(-1)
+                        if outIndex != -1:
+                            listFieldIndexList.append((i, outIndex, fieldDefn.GetType() == ogr.OFTStringList))
+                    else:
+                        outFieldMap.append(outIndex)
 
+                # The ENC metadata fields are the same for every feature in the chart and are not set by
+                # SetFromWithMap, so they are only set once on the reused output feature
+                for k, v in metaValueDict.items():
+                    outIndex = outLayerDefn.GetFieldIndex(k)
+                    outFeat.SetField(outIndex, v)
                     if verbose:
-                        print('\tmem_feat complete')
-                        # print("Name  -  Type  Width  Precision")
-                        # print(f'Field count: {mem_feat.GetFieldCount()}')
-                        # print(f'Field count: {mem_feat.GetFieldCount()}')
-                        # for i in range(mem_feat.GetFieldCount()):
-                        #     print(i)
-                        #     print(mem_feat.GetFieldDefn(i).GetName())
-                        #     fieldName = mem_feat.GetFieldDefn(i).GetName()
-                        #     fieldTypeCode = mem_feat.GetFieldDefn(i).GetType()
-                        #     fieldType = mem_feat.GetFieldDefn(i).GetFieldTypeName(fieldTypeCode)
-                        #     fieldWidth = mem_feat.GetFieldDefn(i).GetWidth()
-                        #     GetPrecision = mem_feat.GetFieldDefn(i).GetPrecision()
-                        #
-                        #     print(f'{fieldName} - {fieldType}  - {fieldWidth} -  {GetPrecision}')
-                        #     sys.exit()
-                    if verbose:
-                        print('\t\t\t\tWriting from S57 to in memory layer')
-                    featureCount = 1
-                    # For each feature in the s57 source layer, transfer the geometry and field values
-                    for feature in layer:
-                        if verbose:
-                            print(f'\t\t\t\t\tcreating feature: {featureCount}')
-                        if feature.geometry().GetGeometryName() != featureType:
+                        print(f'\t{k} field at index {outIndex} being updated to: {v}')
+
+                # For each feature in the s57 source layer, transfer the geometry and field values. This is the only
+                # pass over the s57 layer for this geometry type. The attribute filter leaves features of other
+                # geometry types to be skipped by OGR rather than passed to Python, None type geometries are still
+                # returned so they can be reported. The features of the matching geometry type are counted. Features
+                # are read with GetNextFeature so each one is released as soon as the next one is read, rather than
+                # being held by the layer iterator.
+                layer.SetAttributeFilter(f"OGR_GEOMETRY='{featureType}' OR OGR_GEOMETRY IS NULL")
+                layer.ResetReading()
+                # None type geometries are counted in the loop and logged once after it, so no log message is
+                # formatted for each feature
+                noneTypeCount = 0
+                # The methods called for every feature are bound to local names once rather than looked up on the
+                # layer and feature objects for every feature
+                getNextFeature = layer.GetNextFeature
+                setFromWithMap = outFeat.SetFromWithMap
+                setField = outFeat.SetField
+                setFieldNull = outFeat.SetFieldNull
+                setFID = outFeat.SetFID
+                createFeature = outLayer.CreateFeature
+                outTransaction = startTransaction(outLayer, outDriver.GetName())
+                try:
+                    while True:
+                        feature = getNextFeature()
+                        if feature is None:
+                            break
+                        geom = feature.geometry()
+                        if geom is None:
+                            noneTypeCount += 1
+                            continue
+                        if geom.GetGeometryName() != featureType:
                             if verbose:
-                                print(f'Layer of same name but not matching geometry type: {feature.geometry().GetGeometryName()}')
+                                log.debug('Layer of same name but not matching geometry type: %s',
+                                          geom.GetGeometryName())
                             continue
-                        # print('Setting feature geometry')
-                        # print(f'\tFeature geometry: {feature.geometry}')
-                        # Transfer the geometry of the s57 source feature
-                        geom = feature.geometry()
-                        if verbose:
-                            print(f'Iteration on field geometry type: {featureType}')
-                            print(f'Feature geometry: {geom}')
-                            print(f'X value: {feature.GetGeometryRef().GetX()}')
-                            print(f'Y value: {feature.GetGeometryRef().GetY()}')
-                            print(f'GetGeomName: {feature.geometry().GetGeometryName()}')
-                            print(f'Iteration geometry match feature geometry: {featureType == feature.geometry().GetGeometryName()}')
-                        mem_feat.SetGeometry(geom)
-                        layerDefinition = layer.GetLayerDefn()
+                        importFeatureCount += 1
+                        # The detail of each feature is written to the log file rather than printed, with the message
+                        # only formatted by the logger if the record is handled, and is all within a single verbose
+                        # check so the loop does not check verbose for every step of every feature
                         if verbose:
-                            print(f'\t\tUpdating attribute values of in memory field from s57 source for feature: {featureCount}:')
-                        for i in range(feature.GetFieldCount()):
-                            if verbose:
-                                print(f'\t\t\ti: {i}')
-                            fieldName = layerDefinition.GetFieldDefn(i).GetName()
-                            if fieldName in strFields or fieldName in intFields:
-                                continue
-                            fieldTypeCode = layerDefinition.GetFieldDefn(i).GetType()
-                            fieldType = layerDefinition.GetFieldDefn(i).GetFieldTypeName(fieldTypeCode)
-                            fieldWidth = layerDefinition.GetFieldDefn(i).GetWidth()
-                            GetPrecision = layerDefinition.GetFieldDefn(i).GetPrecision()
-                            # Field definition
-                            if verbose:
-                                print(f"\t\t\t\tField: {fieldName}, type: {fieldType}, width: {str(fieldWidth)}, precision: {str(GetPrecision)}")
+                            log.debug('Creating feature %d of geometry type %s: %s', importFeatureCount, featureType,
+                                      geom)
+                            for i, outIndex in enumerate(outFieldIndexList):
+                                if outIndex != -1:
+                                    log.debug('Setting field %s to %r', fieldNameList[i], feature.GetField(i))
+                        # Copy the geometry and the values of the fields other than the list fields from the s57
+                        # feature in one call, rather than setting each field from Python
+                        setFromWithMap(feature, 1, outFieldMap)
+                        # SCAMAX and SCAMIN correspond to feature level scale max and min
+                        # if layer.schema[i].name in ['SCAMAX', 'SCAMIN'] and value != None:
+                        #     log.info(f'{layer.schema[i].name} = {value}')
+                        for i, outIndex, isStringList in listFieldIndexList:
                             value = feature.GetField(i)
-                            if verbose:
-                                try:
-                                    print(f'\t\t\t\tSetting field {layer.schema[i].name} to {value}')
-                                except:
-                                    print(
-                                        f'\t\t\t\tSetting field {layer.schema[i].name} to {value.encode("utf-8", "replace").decode()}')
-                            # SCAMAX and SCAMIN correspond to feature level scale max and min
-                            # if layer.schema[i].name in ['SCAMAX', 'SCAMIN'] and value != None:
-                            #     log.info(f'{layer.schema[i].name} = {value}')
-                            # Get the index for the memLayer field of the same field name. If the schema does not
-                            #  match then assuming they are in the same order and have the same fields is inaccurate
-                            memLayerLyr_defn = memLayer.GetLayerDefn()
-                            i = memLayerLyr_defn.GetFieldIndex(fieldName)
-                            if i == -1:
-                                if verbose:
-                                    print(f'field {fieldName} does not exist in memLayer')
-                                continue
-                            if verbose:
-                                print(f'\t\t\t\t\tIndex in memLayer for {fieldName}: {i}')
-                            # sys.exit()
-
-                            if 'List' in str(fieldType):
-                                if verbose:
-                                    print(f"\t\t\t\t\t\tStringList field type found ({layer.schema[i].name})")
-                                if str(fieldName) not in AttributesOfListType:
-                                    if verbose:
-                                        print(f'\n\t\t\tAttributesOfTypeList: {AttributesOfListType}')
-                                    AttributesOfListType.append(str(fieldName))
-                                if value is not None:
-                                    if verbose:
-                                        print(f'\t\t\t\t\tConverting list field ({layer.schema[i].name}) content ({value}) to comma separated string')
-                                        # print(f'\t\t\t\tField content type: {type(value)}')
-                                    # Convert to a string with values separated by a comma where there are more than one values
-                                    mem_feat.SetField(i, ",".join([str(i) for i in value]))
-
-                                    # print(",".join(value))
-                                    # sys.exit('Exiting on join value...')
-                                else:
-                                    # Setfield can take the index for the field or the field name
-                                    mem_feat.SetField(fieldName, value)
+                            if value is None:
+                                setFieldNull(outIndex)
+                            elif isStringList:
+                                # Convert to a string with values separated by a comma where there are more than one
+                                # values. The values of string lists are already strings so they are joined directly.
+                                setField(outIndex, ",".join(value))
                             else:
-                                try:
-                                    mem_feat.SetField(fieldName, value)
-                                except:
-                                    mem_feat.SetField(fieldName, f'{value.encode("utf-8", "replace").decode()}')
-                        # if verbose:
-                        #     print('ENCmetaDict:')
-                        #     for k, v in ENCmetaDict.items():
-                        #         print(f'\tkey: {k}')
-                        #         print(f'\tvalue: {v}')
-                        #         print(f'\tvalue type: {type(v)}')
-                        #         print(f'\tkey: {k}, value: {v}, value type: {type(v)}')
-
-                        metaDict = {"ENCSource":"name", "ENCissDate":"issueDate", "ENCComment":"comment", "ENCScale":"scale"}
+                                setField(outIndex, ",".join(map(str, value)))
+
+                        # outFeat is reused for every feature. Every transferred field of the extract is set above
+                        # for each feature (list and missing values as null) so no values carry over from the previous
+                        # feature, the ENC metadata fields keep the values set before the loop, and the FID given to
+                        # the previous feature by CreateFeature is cleared.
+                        setFID(ogr.NullFID)
+                        createFeature(outFeat)
+                except Exception:
+                    if outTransaction:
+                        outLayer.RollbackTransaction()
+                    raise
+                if outTransaction:
+                    outLayer.CommitTransaction()
+                if noneTypeCount:
+                    log.info('%s has %d None type geometries in %s', featureToExtract, noneTypeCount, f)
+                    noneTypeGeometry.append(featureToExtract)
+
+                # Close the extract to save the changes to disk
+                outLayer = None
+                outDS = None
+
+            # If the featureToExtract layer does not exist or does not contain features of the geometry type...
+            if not layer or importFeatureCount == 0:
+                chartsNoFeatureList.append(chartPath)
+                if verbose:
+                    print(f'\t\t{featureToExtract} {featureType} features in chart not found')
+                # sys.exit('ERROR: can not find layer in chart')
+                # Remove the extract created for the chart as it has no features
+                if outFile is not None:
+                    outDriver.DeleteDataSource(outFile)
+                continue
+            # If the coastline layer does exist.
+            if verbose:
+                print(f'\t\tFound {featureToExtract} {featureType} features in chart')
+            extractCountList.append(f'{featureToExtract} {featureType}: {importFeatureCount}')
 
-                        if verbose:
-                            print('\nUpdate field values from DSID source:')
-                        for k, v in metaDict.items():
-                            try:
-                                i = memLayer.GetLayerDefn().GetFieldIndex(k)
-                                if verbose:
-                                    print(f'\t{k} field at index {i} being updated to: {str(ENCmetaDict[v])}')
-                                mem_feat.SetField(i, str(ENCmetaDict[v]))
-                            except:
-                                mem_feat.SetField(i, 'Transfer from s57 failed')
+            if f in [r'test']:
+                failS57SourceList.append(f)
+                log.error('%s failed to be converted but contains %s', f, featureToExtract)
+                outDriver.DeleteDataSource(outFile)
+                continue
 
-                        if verbose:
-                            print('\t\t\tSaving memLayer')
-                        memLayer.CreateFeature(mem_feat)
-                        featureCount += 1
+            # Append the output extract to the list to use it later to
+            # combine all chart extracts into a global extract
+            # TODO: may need to check that all schema definitions are the same
+            #       prior to combining into a global dataset?
+            chartExtractList.append(outFile)
 
-                        # mem_feat.Destroy() # Destroy the feature to free resources
+    # Report the features found in the chart once rather than for every feature/geometry type combination
+    print(f'\t{len(extractCountList)} feature/geometry type combinations found in chart {f}')
+    log.info('Chart %s contains %d feature/geometry type combinations: %s', f, len(extractCountList),
+             ', '.join(extractCountList))
 
-                    # memDS.Destroy # Free memory
-                    # For string list and integer list field types, redefine field
-                    # type to string within the in-memory layer
-                    if verbose:
-                        print('\n\tAltering field definition of string list and '
-                              'integer list field types to string field type:')
-                    for a in AttributesOfListType:
-                        if verbose:
-                            print(f'\t\t{a}')
-                        i = memLayer.GetLayerDefn().GetFieldIndex(a)
-                        fld_defn = ogr.FieldDefn(a, ogr.OFTString)
-                        memLayer.AlterFieldDefn(i, fld_defn, ogr.ALTER_TYPE_FLAG)
+    # Release the chart datasource
+    data = None
 
-                    if verbose:
-                        print('\n\tmemLayer schema post StringList to String type conversion:')
-                    for field in memLayer.schema:
-                        if verbose:
-                            print(f'\t\t{field.name} type: {field.GetFieldTypeName(field.GetType())}')
-                        # if field.name == "LNAM_REFS" or field.name == "FFPT_RIND":
-                        #     print('Can alter field from here??')
+    return extractions, noneTypeGeometry
 
 
-                    if verbose:
-                        print('\n\tWriting from memory to shapefile')
-                    # Create the output shapefile
-                    # Create a new Shapefile
-                    print(f'chartExtractFolder: {chartExtractFolder}')
-                    print(f'f: {f}')
-                    outSHP = os.path.join(chartExtractFolder, f"{f}.shp")
-                    print(f'outShp: {outSHP}')
-                    # Append output shapefile to the list to use it later to
-                    # combine all shapefiles into a global shapefile
-                    chartShapefileList.append(outSHP)
-                    shpDriver = ogr.GetDriverByName("ESRI Shapefile")
-                    shpDS = shpDriver.CreateDataSource(outSHP)
-                    # Create line layer to match the CRS of the source data
-                    shpLayer = shpDS.CreateLayer(f, proj, geom_type=geomType)
-                    # Create the attribute table to match the in memory schema
-                    if verbose:
-                        print('Creating shapefile schema...')
-                    shpLayer.CreateFields(memLayer.schema)
-                    shp_defn = shpLayer.GetLayerDefn()
-                    shp_feat = ogr.Feature(shp_defn)
-                    # if verbose:
-                    #     print('Copy the features, feature by feature, to shapefile')
-                    counter = 1
-                    for feature in memLayer:
-                        if verbose:
-                            print(f'\t\tProcessing feature: {counter}')
-                        counter += 1
-                        geom = feature.geometry()
-                        shp_feat.SetGeometry(geom)
-                        for i in range(feature.GetFieldCount()):
-                            value = feature.GetField(i)
-                            # if verbose:
-                            #     print(f'\t\tSetting field {memLayer.schema[i].name} to {value}')
-                            shp_feat.SetField(i, value)
-
-                        shpLayer.CreateFeature(shp_feat)
-
-                    # Save the changes to the shapefile
-                    shpDS.SyncToDisk()
-                    # sys.exit()
-
-                    memLayersUsed = True
-                    # print(f'AttributeOfListType list: {AttributesOfListType}')
-                    # Reset the list as not all ENC files have the same table structure
-                    # TODO: may need to check that all schema definitions are the same
-                    #       prior to combining into a global dataset?
-                    AttributesOfListType = []
-                    # print(f'AttributeOfListType list: {AttributesOfListType}')
-                    # sys.exit('Exiting to understand processing')
-                else:
-                    failS57SourceList.append(f)
-                    log.error('{f} failed to be converted but contains {featureToExtract}')
+# TODO: User to set printing to verbose for more print statements to support debugging
+verbose = False
+# Debug messages, e.g. the detail of each feature written, are only logged when verbose. Otherwise they are discarded
+# by the logger before their message is formatted or passed from the worker processes to the log file.
+logLevel = log.DEBUG if verbose else log.INFO
+
+# The default is for s57 update files (e.g. .001, .002, .003, ..., .00N) to be applied to the .000 file that this script
+# finds and reads. Applying updates is set to ensure updates are applied.
+# https://gdal.org/drivers/vector/s57.html
+os.environ["OGR_S57_OPTIONS"] = "UPDATES=ON"
+# Open options used for every chart, which also make sure the primitive layers and the linkage fields, which are not
+# extracted, are not built
+s57OpenOptions = ['UPDATES=ON', 'RETURN_PRIMITIVES=OFF', 'RETURN_LINKAGES=OFF']
+
+# List of geometry type to consider for each feature type as some features, e.g. LNDARE, which would be assumed to
+# be polygons have alternative representations, i.e. points, due to generalisation at small scale representation.
+featureTypeList = ['MULTIPOINT', 'POLYGON', 'POINT', 'LINESTRING']
+# ogr field types of the s57 list fields, which are not supported in shapefiles and are written as string fields
+listFieldTypes = (ogr.OFTStringList, ogr.OFTIntegerList, ogr.OFTInteger64List, ogr.OFTRealList)
+# The ogr geometry type used for the extracts of each geometry type in featureTypeList
+geomTypeDict = {'LINESTRING': ogr.wkbLineString,
+                'POLYGON': ogr.wkbPolygon,
+                'POINT': ogr.wkbPoint25D,
+                'MULTIPOINT': ogr.wkbMultiPoint25D}
+
+# SAFEMODE: used to only transfer the fields in the fieldsToRetain list and none of the other fields in the source data.
+# This is used when errors occur relating to the field types, e.g. string list or integer list field types
+#  that are not supported in shapefiles.
+safemode = False
+# Set the fields to retain
+fieldsToRetain = ['RCID', 'PRIM', 'GRUP', 'OBJL', 'RVER', 'AGEN', 'FIDN', 'FIDS', 'LNAM', 'WATLEV',
+                  'OBJNAM']  # 'NATSUR', # StringList type fields cause th memLayer to crash
+# Set of the fields to retain, used to check each field of each layer
+fieldsToRetainSet = frozenset(fieldsToRetain)
+
+# TODO: User to set the format of the chart extracts and the global extract that they are combined into. GeoPackage
+# TODO: ('GPKG') is faster to write than shapefiles ('ESRI Shapefile') as it does not pad every string value to the
+# TODO: width of the field and supports transactions. The global extract is always exported to a shapefile as well.
+outputFormat = 'GPKG'
+# File extension for each of the output formats
+outputExtensionDict = {'ESRI Shapefile': '.shp', 'GPKG': '.gpkg'}
+# SQLite page cache in MB used by the GeoPackage driver, larger than the default to speed up the writes and the
+# spatial index creation of the extracts
+os.environ["OGR_SQLITE_CACHE"] = "200"
+# The GeoPackage outputs are written without waiting for each commit to be synced to disk. The outputs are recreated
+# from the charts if the script is interrupted, so the protection against corruption on a crash is not needed.
+os.environ["OGR_SQLITE_SYNCHRONOUS"] = "OFF"
+# The SQLite rollback journal of the GeoPackage outputs is kept in memory rather than written to a file alongside them
+os.environ["OGR_SQLITE_JOURNAL"] = "MEMORY"
+
+# The output driver and the spatial reference of the global extracts are only looked up and created once, rather than
+# for every chart and every feature/geometry type combination
+outDriver = ogr.GetDriverByName(outputFormat)
+wgs84 = osr.SpatialReference()
+wgs84.ImportFromEPSG(4326)
+
+# TODO: User to set the number of worker processes used to extract features from the charts, one per CPU by default
+maxWorkers = os.cpu_count()
+
+
+if __name__ == '__main__':
+    # Set intial time
+    t0 = time.time()
+
+    # parentFolder from which all content within subfolders is searched for s57 data
+    parentFolder = input("Enter the top folder to search within for s57 (.000) data: ")
+    while not os.path.exists(f'{parentFolder}'):# Test to make sure an input was provided
+        print('No existing top folder provided...')
+        parentFolder = input("\tEnter the top folder: ")
+
+    # TODO: The user is required to identify the feature type to extract and the geometry type of that feature
+    # S57 feature type to extract: Consider Group 1 (higher priority) amongst Group 2 features
+    # 'CBLSUB': Submarine cables,
+    # 'CBLARE': Cable area
+    # 'PIPSOL': Pipelines - Submarine or on land
+    # 'PIPARE': Pipeline area
+    # 'COALNE': coastline (broken by shoreline construction ('SLCONS'), This is not the charted low water line, see DEPCNT
+    #           also see LNDARE
+    # 'RESARE': Restricted area (other objects have an attribute RESTRN, e.g. 'CBLARE'
+    # 'DEPCNT' # depth contour features, VALDCO = 0 = charted low water line, VALDCO < 0 = drying land
+    # 'SBDARE' # Seabed area features (includes reefs, coral reefs = 'NATSUR' = 14)
+    # 'SOUNDG' # Sounding, negative values are drying heights, this is a multipoint feature
+    # 'DEPARE' # Depth Area, Group 1, DRVAL1 = drying height value for a range of drying values the shoalest is used
+    # 'UWTROC' # Underwater rock
+    # 'LNDARE' # Land area: Group 1 (Point, Line and Polygon geometry)
+    # 'LNDELV' # Land elevation, spot heights and also represented in line geometry
+    # 'UNSARE' # Unsurveyed Area: Group 1
+    # 'BUISGL' # Building Single: light houses and other buildings.
+    # 'BCNISD', 'BCNLAT', 'BCNSAW', 'BCNSPP'  # Beacon features
+
+    # If True then all the available feature types are extracted as identified from the ENC source data
+    # If False then a manually adjusted list is used.
+    # TODO: User to set this to true if you would like to extract all the features that are present in the collection of
+    # TODO: s57 files that are being processed. If false then the featureToExtractList is used instead. The latter has been
+    # TODO: tested and is more likely to work.
+    extractAlls57FeaturesInData = True
+
+    # The list of charts is used for each feature/geometry type combination so the generator is read into a list
+    encList = list(chartGetter(parentFolder))
+    # The extracts of every chart are named up front so that charts sharing a file name are given distinct extracts
+    extractNames = extractFileNames(encList, parentFolder)
+
+    if extractAlls57FeaturesInData:
+        featureToExtractList = featureTypeGetter(encList)
+    else:
+        # Manual setting of features to extract
+        # Priority 'Skin of the Earth' features for charting (Group 1) are:
+        # 'DEPARE', 'DRGARE', 'FLODOC', 'HULKES', 'LNDARE', 'PONTON', 'UNSARE'
+        # featureToExtractList = ['CBLSUB', 'COALNE', 'RESARE', 'DEPCNT', 'SBDARE', 'SOUNDG', 'DEPARE', 'LNDARE', 'LNDELV',
+        #                         'UNSARE', "BUISGL", 'UWTROC', 'BCNCAR', 'BCNISD', 'BCNLAT', 'BCNSAW', 'BCNSPP', 'CBLARE',
+        #                         'PIPSOL', 'PIPARE']
+        featureToExtractList = ['SOUNDG', 'LNDARE', 'LNDELV']
+
+    print('Feature type list:')
+    for f in featureToExtractList:
+        print(f'\t{f}')
+
+    dateTimeNow = f"_{datetime.datetime.now().strftime('%d_%m_%Y_%Hh%Mm%Ss')}"
+
+    # Create folder to store coastline extracts with a date time stamp
+    folderDateTime = dateTimeNow
+    parentFolderHead, parentFolderName = os.path.split(parentFolder)
+    extractRoot = os.path.join(parentFolderHead, f'{parentFolderName}_extracted_{folderDateTime}')
+
+    # Make the root directory
+    os.makedirs(extractRoot)
+
+    # Establish the log file
+    logfile = os.path.join(extractRoot, rf'featureExtraction_logfile_{folderDateTime}.log')
+    print(f'Logfile in: {logfile}')
+
+    log.basicConfig(filename=logfile,
+                        level=logLevel,
+                        filemode='w',# 'w' = overwrite log file, 'a' = append
+                        format='%(asctime)s,   Line:%(lineno)d %(levelname)s: %(message)s',
+                        datefmt='%a %d/%b/%Y %I:%M:%S %p')
+    # Log the path and name of the script used to the logfile
+    log.info('Script started: ' + sys.argv[0])
+    # Log the parent folder to the logfile
+    log.info('Parent folder to find s57 data within: ' + parentFolder)
+    # Log the GDAL configuration options set by this script so the settings of each run are recorded
+    for option in ['OGR_S57_OPTIONS', 'OGR_SQLITE_CACHE', 'OGR_SQLITE_SYNCHRONOUS', 'OGR_SQLITE_JOURNAL']:
+        log.info('GDAL configuration option %s=%s', option, gdal.GetConfigOption(option))
+
+    # Save the script to the outFolder to store with the outputs
+    shutil.copy2(sys.argv[0], extractRoot)
+
+    # Copy the example QGIS project which includes example S.57 data, ENC/chart webservices and the ESRI World Image
+    # basemap to the output data folder. Users can then trace the source to feature/geometry type extractions including the
+    # chart specific and global compilations.
+    # The extract root is created alongside the parent folder so the QGIS folder is looked for in the same folder
+    qgisFolder = os.path.join(parentFolderHead, 'qgis')
+    if os.path.exists(qgisFolder):
+        print(f'Copying QGIS folder: {qgisFolder}')
+        print(f'To {os.path.join(extractRoot, "qgis")}')
+        shutil.copytree(qgisFolder, os.path.join(extractRoot, 'qgis'))
+        log.info(f'Copied example QGIS project to: {extractRoot}\qgis')
+    else:
+        log.info(f'Copy failed, QGIS project example does not exist')
+
+
+    # Attempt to save the s57 reference docs to the outfolder
+    refList = [r'https://iho.int/iho_pubs/standard/S-57Ed3.1/S-57%20Appendix%20B.1%20Annex%20A%20UOC%20Edition%204.1.0_Jan18_EN.pdf',
+               r'https://www.hydro.gov.au/prodserv/important-info/SPEC_05_55_AA34159_AUOC.pdf']
+    # The docs are downloaded in background threads while the charts are processed and the downloads are checked
+    # before the script completes.
+    downloadExecutor = ThreadPoolExecutor(max_workers=len(refList))
+    downloadList = []
+    for url in refList:
+        refPath = os.path.join(extractRoot, os.path.split(url)[1])
+        if not os.path.exists(refPath):
+            print(f'Attempting to save to: {refPath}')
+            downloadList.append((url, downloadExecutor.submit(urllib.request.urlretrieve, url, refPath)))
+        else:
+            print('\tFile exists, not overwritten')
+
+    #os.path.join(os.path.split(workspace)[0],r'logfile.log')
+
+    if extractAlls57FeaturesInData:
+        log.info('All available feature types being extracted from the s.57 source data')
+    noneTypeGeometry = []
+
 
-        log.info('Shapefile conversion for each s57 chart complete')
-        # Convert all the individual ENC shapefiles into one shapefile
-        print('\nCombining all ENC shapefiles to a global shapefile')
-        # If there are no shapefiles generated from charts for the feature/feature type combination then delete the
+    # The output folders and the lists used to report on each feature/geometry type combination are set up before any
+    # charts are read, as each chart is opened once and all of the combinations are extracted from it while it is open.
+    extractions = {}
+    for featureToExtract in featureToExtractList:
+        for featureType in featureTypeList:
+            geomType = geomTypeDict.get(featureType)
+            if geomType is None:
+                sys.exit(f'Feature type not handled: {featureType}')
+
+            outFolder = os.path.join(extractRoot, f'{featureToExtract}', f'{featureType}')
+            chartExtractFolder = os.path.join(outFolder, f'ENCsContaining{featureType}')
+            if verbose:
+                print(f'Extracting {featureToExtract} of geometry type {featureType} to {outFolder} with chart extracts in'
+                      f' {chartExtractFolder}')
+            log.info(f'Extracting {featureToExtract} of geometry type {featureType} to {outFolder} with chart extracts in'
+                     f' {chartExtractFolder}')
+
+            os.makedirs(outFolder)
+            os.makedirs(chartExtractFolder)
+
+            # Initiate empty lists to contain the path to s57 files that contain or
+            # don't contain coastline data. Only used to report on numbers of charts with
+            # coastline at the end of the script. The list of extracts created for each
+            # chart is used to combine them later into a single composite.
+            extractions[(featureToExtract, featureType)] = {'geomType': geomType,
+                                                            'outFolder': outFolder,
+                                                            'chartExtractFolder': chartExtractFolder,
+                                                            'failS57SourceList': [],
+                                                            'chartList': [],
+                                                            'chartsNoFeatureList': [],
+                                                            'chartsWithFeatureList': [],
+                                                            'chartExtractList': []}
+
+    # Each chart is processed in a worker process. The worker log records are written to the log file by a listener in
+    # this process. The worker processes are spawned rather than forked, as forking a process that is running threads
+    # (the listener and the reference doc downloads) is not safe.
+    extractFolders = {key: (extraction['geomType'], extraction['chartExtractFolder'])
+                      for key, extraction in extractions.items()}
+    mpContext = multiprocessing.get_context('spawn')
+    logQueue = mpContext.Queue()
+    logListener = QueueListener(logQueue, *log.getLogger().handlers)
+    logListener.start()
+    try:
+        with ProcessPoolExecutor(max_workers=maxWorkers, mp_context=mpContext, initializer=initWorker,
+                                 initargs=(logQueue,)) as executor:
+            # Results are returned in the order of encList so the chart extracts are combined in the same order
+            chartProcessor = partial(processChart, featureToExtractList=featureToExtractList,
+                                     extractFolders=extractFolders)
+            for chartExtractions, chartNoneTypeGeometry in executor.map(chartProcessor, encList,
+                                                                        [extractNames[c] for c in encList]):
+                noneTypeGeometry.extend(chartNoneTypeGeometry)
+                for key, chartExtraction in chartExtractions.items():
+                    for listName, chartValues in chartExtraction.items():
+                        extractions[key][listName].extend(chartValues)
+    finally:
+        # Stop the listener, writing any remaining worker log records, including when a worker fails
+        logListener.stop()
+
+    log.info('Extraction for each s57 chart complete')
+
+    # Options used to export the global extract to a shapefile when the chart extracts are not shapefiles
+    shpExportOptions = gdal.VectorTranslateOptions(format='ESRI Shapefile', options=['-gt', '65536'])
+
+    for (featureToExtract, featureType), extraction in extractions.items():
+        print(f'\n**********************************************\nCombining feature: {featureToExtract} of geometry type '
+              f'{featureType}\n**********************************************\n')
+        geomType = extraction['geomType']
+        outFolder = extraction['outFolder']
+        failS57SourceList = extraction['failS57SourceList']
+        chartList = extraction['chartList']
+        chartsNoFeatureList = extraction['chartsNoFeatureList']
+        chartsWithFeatureList = extraction['chartsWithFeatureList']
+        chartExtractList = extraction['chartExtractList']
+
+        # Combine all the individual ENC extracts into one global extract
+        print('\nCombining all ENC extracts to a global extract')
+        # If there are no extracts generated from charts for the feature/feature type combination then delete the
         # folder for this combination and move on.
         if len(chartList) == 0:
             sys.exit(f'No ENC files were found, exiting...')
-        if len(chartShapefileList) == 0:
+        if len(chartExtractList) == 0:
             print('No feature/geometry type combinations were found, deleting folder...')
             shutil.rmtree(outFolder)
             continue
 
         globalShp = os.path.join(outFolder, f"global_{featureToExtract}_{featureType}.shp")
+        globalOutput = os.path.join(outFolder,
+                                    f"global_{featureToExtract}_{featureType}{outputExtensionDict[outputFormat]}")
         if verbose:
-            print(f'\t{globalShp}')
-            log.info(f'globalShp: {globalShp}')
-        shpDS = shpDriver.CreateDataSource(globalShp)
-        # Create line layer to match the CRS of the source data
-        # Create spatial reference
+            print(f'\t{globalOutput}')
+            log.info(f'globalOutput: {globalOutput}')
+        outDS = outDriver.CreateDataSource(globalOutput)
+        # Create the global layer in WGS84
         if verbose:
             print('\tSetting the CRS')
             log.info('Setting the CRS')
-        proj = osr.SpatialReference()
-        proj.ImportFromEPSG(4326)
-
-        globalShpLayer = shpDS.CreateLayer('global', proj, geom_type=geomType)
+        globalLayer = outDS.CreateLayer('global', wgs84, geom_type=geomType)
         if verbose:
-            print('\tCreated the global shape layer')
-            log.info('Created the global shape layer')
-        # Create the attribute table to match the in memory schema
-        globalShpLayer.CreateFields(memLayer.schema)
+            print('\tCreated the global layer')
+            log.info('Created the global layer')
+        # Create the attribute table to match the schema of the chart extracts
+        globalLayer.CreateFields(combinedSchema(chartExtractList))
         if verbose:
-            print('\tCreated the schema in the global shapefile')
-            log.info('Created the schema in the global shapefile')
-        globalShp_defn = globalShpLayer.GetLayerDefn()
-        if verbose:
-            print('\tCreating the shp_feature')
-            log.info('Creating the shp_feature')
-        shp_feat = ogr.Feature(globalShp_defn)
-        # Process each chart coastline shapefile
-        for shpFile in chartShapefileList:
-            # print(f'Processing: {os.path.split(shpFile)[1]}')
+            print('\tCreated the schema in the global extract')
+            log.info('Created the schema in the global extract')
+        if hasattr(globalLayer, 'WriteArrowBatch'):
+            # Append each chart extract to the global output in record batches with the GDAL Arrow interface (GDAL
+            # 3.8+), all within a single transaction, rather than one feature at a time.
+            globalTransaction = startTransaction(globalLayer, outDriver.GetName())
+            for extractFile in chartExtractList:
+                if verbose:
+                    print(f'\tProcessing: {extractFile}')
+                ds = ogr.Open(extractFile)
+                if not appendWithArrow(ds.GetLayer(), globalLayer):
+                    log.error(f'{extractFile} failed to be appended to {globalOutput}')
+                    failS57SourceList.append(os.path.split(extractFile)[1])
+                ds = None
+            if globalTransaction:
+                globalLayer.CommitTransaction()
+            # Close the global output to save the appended features to disk
+            globalLayer = None
+            outDS = None
+        else:
+            # Close the global output so the chart extracts can be appended to it
+            globalLayerName = globalLayer.GetName()
+            globalLayer = None
+            outDS = None
+
+            # Append each chart extract to the global extract with ogr2ogr, which copies the features within GDAL in
+            # large transaction groups rather than one feature at a time from Python. Fields are matched by name.
+            globalTranslateOptions = gdal.VectorTranslateOptions(accessMode='append', layerName=globalLayerName,
+                                                                 options=['-gt', '65536'])
+            for extractFile in chartExtractList:
+                # print(f'Processing: {os.path.split(extractFile)[1]}')
+                if verbose:
+                    print(f'\tProcessing: {extractFile}')
+                globalDS = gdal.VectorTranslate(globalOutput, extractFile, options=globalTranslateOptions)
+                if globalDS is None:
+                    log.error(f'{extractFile} failed to be appended to {globalOutput}')
+                    failS57SourceList.append(os.path.split(extractFile)[1])
+                # Close the global output to save the appended features to disk
+                globalDS = None
+
+        # The global extract is exported to a shapefile once all of the chart extracts have been combined
+        if outputFormat != 'ESRI Shapefile':
             if verbose:
-                print(f'\tProcessing: {shpFile}')
-            ds = ogr.Open(shpFile)
-            lyr = ds.GetLayer()
-            for feat in lyr:
-                out_feat = ogr.Feature(globalShpLayer.GetLayerDefn())
-                out_feat.SetGeometry(feat.GetGeometryRef().Clone())
-                for i in range(feat.GetFieldCount()):
-                    value = feat.GetField(i)
-                    # if verbose:
-                    #     print(f'\t\tSetting field {lyr.schema[i].name} to {value}')
-                    out_feat.SetField(i, value)
-                globalShpLayer.CreateFeature(out_feat)
-                globalShpLayer.SyncToDisk()
+                print(f'\tExporting to: {globalShp}')
+            globalDS = gdal.VectorTranslate(globalShp, globalOutput, options=shpExportOptions)
+            if globalDS is None:
+                log.error(f'{globalOutput} failed to be exported to {globalShp}')
+            globalDS = None
 
         log.info(f'Composite shapefile complete: {globalShp}')
-        print(f'\noutFolder for global shape file: {outFolder}')
+        print(f'\noutFolder for global extract: {outFolder}')
         print('\tComposite complete.')
 
         print(f'\n{len(chartsWithFeatureList) + len(chartsNoFeatureList)} charts found')
@@ -755,7 +910,7 @@ for featureToExtract in featureToExtractList:
         print(f'\t{len(chartsNoFeatureList)} charts with no {featureToExtract} features')
         for g in failS57SourceList:
             print(g)
-            log.error('Failed to convert {featureToExtract} in {g}')
+            log.error('Failed to convert %s in %s', featureToExtract, g)
 
         print(f'\nScript completed in {round((time.time() - t0)/60, 2)} minutes')
 
@@ -764,12 +919,20 @@ for featureToExtract in featureToExtractList:
         log.info(f'{len(chartsNoFeatureList)} charts with no {featureToExtract} layer')
         log.info(f'Script completed in {round((time.time() - t0)/60, 2)} minutes')
 
-print(f'\nNone type geometry for the following s57 feature types:')
-noneTypeGeometrySet = set(noneTypeGeometry)
-for noneType in noneTypeGeometrySet:
-    print(f'\t{noneType}')
-    log.info(f'{noneType} s57 feature failed extraction due to a noneType geometry')
+    print(f'\nNone type geometry for the following s57 feature types:')
+    noneTypeGeometrySet = set(noneTypeGeometry)
+    for noneType in noneTypeGeometrySet:
+        print(f'\t{noneType}')
+        log.info(f'{noneType} s57 feature failed extraction due to a noneType geometry')
 
-log.info(f'Script completed in {round((time.time() - t0)/60, 2)} minutes')
-print(f'Script completed in {round((time.time() - t0)/60, 2)} minutes')
+    # Wait for the s57 reference docs to finish downloading
+    for url, download in downloadList:
+        try:
+            download.result()
+        except Exception as e:
+            print(f'\tCould not download/save: {url}')
+            log.error('Could not download/save %s: %s', url, e)
+    downloadExecutor.shutdown()
 
+    log.info(f'Script completed in {round((time.time() - t0)/60, 2)} minutes')
+    print(f'Script completed in {round((time.time() - t0)/60, 2)} minutes')